@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of BibItNow prefselector resolution over the full URL-specific adjuster list, comparing the
+UrlAdjusterIndex against a linear scan with the same semantics.
+"""
+import argparse
+import json
+import re
+import timeit
+from pathlib import Path
+from urllib.parse import urlparse
+
+import bibquery
+from bibquery.adjusters import UrlAdjusterIndex
+
+SAMPLE_URLS = [
+    "https://dl.acm.org/doi/10.1145/3065386",
+    "https://ieeexplore.ieee.org/document/726791",
+    "https://ieeexplore.ieee.org/abstract/document/726791",
+    "https://link.springer.com/article/10.1007/s11263-015-0816-y",
+    "https://link.springer.com/chapter/10.1007/978-3-319-10602-1_48",
+    "https://www.sciencedirect.com/science/article/pii/S0893608014002135",
+    "https://onlinelibrary.wiley.com/doi/10.1002/rob.21918",
+    "https://www.ncbi.nlm.nih.gov/pmc/articles/PMC3104254/",
+    "https://pubmed.ncbi.nlm.nih.gov/26017442/",
+    "https://www.amazon.com.au/dp/0262035618",
+    "https://www.amazon.de/dp/0262035618",
+    "https://books.google.co.uk/books?id=omivDQAAQBAJ",
+    "https://en.wikipedia.org/wiki/Transformer_(machine_learning_model)",
+    "https://arxiv.org/abs/1706.03762",
+    "https://proceedings.neurips.cc/paper/2017/hash/3f5ee243547dee91fbd053c1c4a845aa-Abstract.html",
+    "https://openreview.net/forum?id=YicbFdNTTy",
+    "https://www.example.com/some/page.html",
+]
+
+
+def find_prefselector_linear(adjusters, url):
+    url_parsed = urlparse(url)
+    domain, _, top = (url_parsed.hostname or "").rpartition(".")
+    if domain.startswith("www."):
+        domain = domain[4:]
+    path = url_parsed.path[1:]
+    if url_parsed.query:
+        path = f"{path}?{url_parsed.query}"
+    for adjuster in adjusters:
+        if re.fullmatch(adjuster["scheme"], domain) is None:
+            continue
+        tops = adjuster["top"] if isinstance(adjuster["top"], list) else [{"scheme": adjuster["top"]}]
+        for top_adjuster in tops:
+            if re.fullmatch(top_adjuster["scheme"], top) is None:
+                continue
+            prefselector = top_adjuster.get("prefselector", adjuster.get("prefselector"))
+            paths = top_adjuster.get("path", adjuster.get("path"))
+            if paths is None:
+                return prefselector
+            for path_adjuster in [{"scheme": paths}] if isinstance(paths, str) else paths:
+                if re.match(path_adjuster["scheme"], path) is not None:
+                    return path_adjuster.get("prefselector") or prefselector
+    raise ValueError(f"No valid adjuster found for url {url}.")
+
+
+def resolve_all(resolve, urls):
+    results = []
+    for url in urls:
+        try:
+            results.append(resolve(url))
+        except ValueError:
+            results.append(ValueError)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--number", type=int, default=200, help="Number of passes over the URL list.")
+    args = parser.parse_args()
+
+    with (Path(bibquery.__file__).parent / "res" / "urlSpecificAdjusterList.json").open() as f:
+        adjusters = json.load(f)
+
+    urls = list(SAMPLE_URLS)
+    for adjuster in adjusters:
+        # Literal schemes can be turned into matching URLs directly
+        if re.fullmatch(r"(?:[0-9a-z\-]|\\\.)+", adjuster["scheme"]) is not None:
+            top = adjuster["top"] if isinstance(adjuster["top"], str) else adjuster["top"][0]["scheme"]
+            path = adjuster.get("path", "")
+            path = path if isinstance(path, str) else path[0]["scheme"]
+            urls.append(f"https://{adjuster['scheme'].replace(chr(92), '')}.{top}/{path.replace(chr(92), '')}")
+
+    index = UrlAdjusterIndex(adjusters)
+    expected = resolve_all(lambda u: find_prefselector_linear(adjusters, u), urls)
+    actual = resolve_all(index.find_prefselector, urls)
+    mismatches = [(u, e, a) for u, e, a in zip(urls, expected, actual) if e != a]
+    if len(mismatches) > 0:
+        raise AssertionError(f"Index and linear scan disagree: {mismatches}")
+
+    build_time = min(timeit.repeat(lambda: UrlAdjusterIndex(adjusters), number=10, repeat=3)) / 10
+    linear_time = min(timeit.repeat(
+        lambda: resolve_all(lambda u: find_prefselector_linear(adjusters, u), urls), number=args.number, repeat=3))
+    index_time = min(timeit.repeat(lambda: resolve_all(index.find_prefselector, urls), number=args.number, repeat=3))
+    lookups = args.number * len(urls)
+    print(f"{len(adjusters)} adjusters, {len(urls)} URLs, {lookups} lookups per run")
+    print(f"Index build:  {build_time * 1e3:8.3f} ms")
+    print(f"Linear scan:  {linear_time / lookups * 1e6:8.3f} us/lookup")
+    print(f"Index lookup: {index_time / lookups * 1e6:8.3f} us/lookup ({linear_time / index_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
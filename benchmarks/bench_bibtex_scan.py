@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the BibTeX extraction used by the regex search strategies on large and pathological inputs. For each
+input family, the input size is doubled repeatedly to show that the runtime of the scanner grows linearly. If the
+"regex" and "bibtexparser" (< 2.0) packages are installed, the previous implementation (recursive pattern, full parse
+and SequenceMatcher per candidate) is timed for comparison on the smaller sizes.
+"""
+import argparse
+import time
+from difflib import SequenceMatcher
+
+from bibquery.bibtex_scan import best_matching_entry
+
+try:
+    import bibtexparser
+    from regex import regex
+except ImportError:
+    bibtexparser = regex = None
+
+LEGACY_PATTERN = r"(@(?:article|book|misc|inproceedings)(?P<yolo>{(?:[^{}]+|(?&yolo))*}))"
+ENTRY = "<li><pre>@inproceedings{{key{i},\n  title={{Paper number {i} on {{Deep}} Learning}},\n" \
+        "  author={{Doe, Jane}},\n  year={{2020}}\n}}</pre></li>\n"
+
+
+def listing(n: int) -> str:
+    # A proceedings listing with many entries, the target entry being the last one
+    return "<ul>" + "".join(ENTRY.format(i=i) for i in range(n)) + "</ul>"
+
+
+def unclosed_openers(n: int) -> str:
+    # Many entry openers that are never closed
+    return "@article{ some text " * n
+
+
+def deep_nesting(n: int) -> str:
+    # An entry with deeply nested but unbalanced braces
+    return "@article{key, title={" + "{a" * n + "}" * (n - 1)
+
+
+def nested_fields(n: int) -> str:
+    # An entry whose note contains many text pieces looking like fields, which must not be mistaken for its title
+    return "@article{key, note={" + ", title={a}" * n + "}, title={Some Title}}"
+
+
+def brace_heavy(n: int) -> str:
+    # Lots of braces from inline scripts and styles, without any BibTeX
+    return "<script>function f() { if (x) { return {a: {b: 1}}; } }</script>" * n
+
+
+FAMILIES = {
+    "listing": (listing, "Paper number {n} on Deep Learning"),
+    "unclosed_openers": (unclosed_openers, "Some Title"),
+    "deep_nesting": (deep_nesting, "Some Title"),
+    "nested_fields": (nested_fields, "Some Title"),
+    "brace_heavy": (brace_heavy, "Some Title"),
+}
+
+
+def legacy_extract(text: str, page_title: str):
+    scores = {}
+    for c, *_ in regex.findall(LEGACY_PATTERN, text):
+        citation = bibtexparser.loads(c)
+        if len(citation.entries) == 1:
+            title = citation.entries[0].get("title")
+            matcher = SequenceMatcher(None, title, page_title)
+            largest_block = max(matcher.get_matching_blocks(), key=lambda m: m.size)
+            if (largest_block.size / len(title) > 0.5 or largest_block.size / len(page_title) > 0.5 and
+                    largest_block.size / len(title) > 0.15):
+                scores[c] = largest_block.size / len(title)
+    return max(scores, key=scores.get) if len(scores) > 0 else None
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--min-size", type=int, default=250, help="Smallest input size (number of repetitions).")
+    parser.add_argument("--steps", type=int, default=6, help="Number of size doublings.")
+    parser.add_argument("--legacy-steps", type=int, default=3,
+                        help="Number of sizes to time the legacy recursive pattern on.")
+    args = parser.parse_args()
+
+    print(f"{'family':<18} {'size':>8} {'chars':>10} {'scanner [ms]':>13} {'legacy [ms]':>12}")
+    for name, (make_input, title_template) in FAMILIES.items():
+        for step in range(args.steps):
+            n = args.min_size * 2 ** step
+            text = make_input(n)
+            page_title = title_template.format(n=n - 1)
+            scanner_time = timed(best_matching_entry, text, page_title)
+            legacy = "-"
+            if regex is not None and hasattr(bibtexparser, "loads") and step < args.legacy_steps:
+                legacy = f"{timed(legacy_extract, text, page_title) * 1e3:12.2f}"
+            print(f"{name:<18} {n:>8} {len(text):>10} {scanner_time * 1e3:13.2f} {legacy:>12}")
+
+
+if __name__ == "__main__":
+    main()
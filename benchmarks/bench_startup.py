@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the startup of BibQuery. Measures the import time in fresh interpreters, which third-party modules the
+imports pull in, and the time to start browsers with and without the profile template, broken down into the stages
+reported by the timing hooks. The first browser of each run includes resolving geckodriver and, if the template is
+missing or outdated, building it, so the maximum of those stages shows the cold and the mean the warm start.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from bibquery import DEFAULT_CACHE_PATH, BibQuery, MetricsCollector, ResolverRegistry
+
+REPO_PATH = Path(__file__).parent.parent
+
+IMPORT_STATEMENTS = [
+    "import bibquery",
+    "from bibquery import BibQuery",
+    "from bibquery import BibQuery; BibQuery(use_result_cache=False, use_strategy_stats=False).initialize()",
+    "from bibquery import query_batch",
+]
+
+HEAVY_MODULES = ["selenium", "webdriver_manager", "requests", "asyncio", "sqlite3"]
+
+BROWSER_STAGES = ["driver_resolution", "profile_setup", "browser_launch", "addon_install"]
+
+MEASURE_SCRIPT = """
+import json, sys, time
+start_time = time.perf_counter()
+exec(sys.argv[1])
+duration = time.perf_counter() - start_time
+print(json.dumps([duration, [m for m in sys.argv[2:] if m in sys.modules]]))
+"""
+
+
+def measure_import(statement: str, repeat: int):
+    durations = []
+    modules: List[str] = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", MEASURE_SCRIPT, statement, *HEAVY_MODULES], check=True,
+                                capture_output=True, text=True, cwd=REPO_PATH).stdout
+        duration, modules = json.loads(output)
+        durations.append(duration)
+    print(f"{statement[:64]:<64} {statistics.median(durations) * 1e3:>9.1f} {min(durations) * 1e3:>9.1f}  "
+          f"{', '.join(modules) or '-'}")
+
+
+def bench_browser_start(use_profile_template: bool, repeat: int):
+    metrics = MetricsCollector()
+    durations = []
+    for _ in range(repeat):
+        with BibQuery(use_result_cache=False, use_strategy_stats=False, resolvers=ResolverRegistry(),
+                      use_profile_template=use_profile_template, timing_hooks=[metrics]) as bq:
+            start_time = time.perf_counter()
+            bq.start_browser()
+            durations.append(time.perf_counter() - start_time)
+    name = "template" if use_profile_template else "new profile"
+    print(f"{name:<20} {'total':<18} {len(durations):>5} {statistics.mean(durations) * 1e3:>10.1f} "
+          f"{max(durations) * 1e3:>10.1f}")
+    stages = metrics.aggregate()
+    for stage in BROWSER_STAGES:
+        record = stages.get((stage, ""))
+        if record is not None:
+            print(f"{'':<20} {stage:<18} {record.count:>5} {record.mean_time * 1e3:>10.1f} "
+                  f"{record.max_time * 1e3:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Number of measurements per benchmark.")
+    parser.add_argument("--no-browser", action="store_true", help="Only benchmark the imports.")
+    parser.add_argument("--rebuild-template", action="store_true",
+                        help="Delete the profile template in the cache directory first, so that its build is "
+                             "included.")
+    args = parser.parse_args()
+
+    print(f"{'import':<64} {'p50 [ms]':>9} {'min [ms]':>9}  modules")
+    for statement in IMPORT_STATEMENTS:
+        measure_import(statement, args.repeat)
+    if args.no_browser:
+        return
+
+    if args.rebuild_template:
+        shutil.rmtree(DEFAULT_CACHE_PATH / "profile_template", ignore_errors=True)
+    print()
+    print(f"{'browser start':<20} {'stage':<18} {'runs':>5} {'mean [ms]':>10} {'max [ms]':>10}")
+    bench_browser_start(False, args.repeat)
+    bench_browser_start(True, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the query strategies and of full batches. Pages are served from benchmarks/snapshots by a local
+HTTP proxy, through which the browser and the HTTP strategies make all their requests, so no outside network is
+needed. For each strategy, every page is queried repeatedly in headless Firefox, reporting latency percentiles,
+throughput and peak memory (including the browser processes if psutil is installed).
+
+The bundled snapshots are synthetic fixtures of a few KB, hand-written after the markup of arXiv, IEEE, ACM,
+Springer, the ACL Anthology and Google Scholar. They contain the elements the strategies look for, but neither the
+scripts nor the sub-resources of the real pages. They are therefore suited for comparing the overhead of the
+strategies and batches and for catching regressions in them, but page load times, the effect of lean mode and memory
+usage are far below those of real pages. For representative numbers, record real pages with --record while online
+and benchmark those.
+"""
+import argparse
+import json
+import math
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+from bibquery import BibQuery, LeanMode, ResolverRegistry, ScholarScheduler, iter_query_batch
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SNAPSHOT_PATH = Path(__file__).parent / "snapshots"
+STRATEGIES = ["http_regex_search", "regex_search", "bibitnow", "google_scholar"]
+
+
+def load_snapshots(path: Path) -> Tuple[Dict[str, Tuple[Path, str]], List[str]]:
+    with (path / "manifest.json").open() as f:
+        manifest = json.load(f)
+    snapshots = {}
+    pages = []
+    for entry in manifest:
+        key = entry["url"]
+        if entry.get("ignore_query", False):
+            key = urlunsplit(urlsplit(key)._replace(query=""))
+        snapshots[key] = (path / entry["file"], entry["content_type"])
+        if entry.get("page", False):
+            pages.append(entry["url"])
+    return snapshots, pages
+
+
+@contextmanager
+def snapshot_proxy(snapshots: Dict[str, Tuple[Path, str]]) -> Iterator[str]:
+    # Proxies receive the absolute URL in the request line, which is looked up with and without its query
+    contents = {url: (file.read_bytes(), content_type) for url, (file, content_type) in snapshots.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = self.path.rstrip("?")
+            content = contents.get(url) or contents.get(urlunsplit(urlsplit(url)._replace(query="")))
+            if content is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content[1]}; charset=utf-8")
+            self.send_header("Content-Length", str(len(content[0])))
+            self.end_headers()
+            self.wfile.write(content[0])
+
+        def do_CONNECT(self):
+            # HTTPS would have to go to the outside network
+            self.send_error(405)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class MemorySampler:
+    """
+    Samples the resident memory of this process and, with psutil, of its child processes (geckodriver and Firefox).
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.__interval = interval
+        self.__peak = 0
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.__peak = self.__sample()
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__stop.set()
+        self.__thread.join()
+
+    @property
+    def peak_mb(self) -> float:
+        return self.__peak / 2 ** 20
+
+    def __run(self):
+        while not self.__stop.wait(self.__interval):
+            self.__peak = max(self.__peak, self.__sample())
+
+    @staticmethod
+    def __sample() -> int:
+        if psutil is None:
+            # Peak of this process only, in KiB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+
+def percentile(values: List[float], p: float) -> float:
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def report(name: str, latencies: List[float], successes: int, wall_time: float, peak_mb: float):
+    if len(latencies) == 0:
+        return
+    print(f"{name:<24} {len(latencies):>5} {successes:>5} {percentile(latencies, 50) * 1e3:>9.1f} "
+          f"{percentile(latencies, 90) * 1e3:>9.1f} {percentile(latencies, 99) * 1e3:>9.1f} "
+          f"{len(latencies) / wall_time:>8.2f} {peak_mb:>9.1f}")
+
+
+def bibquery_kwargs(proxy: str, timeout: float, lean: bool) -> dict:
+    # Everything that could reach the outside network or persist state is disabled or redirected to the proxy
+    return dict(use_strategy_stats=False, resolvers=ResolverRegistry(), proxy=proxy,
+                scholar_url="http://scholar.google.com", scholar_scheduler=offline_scholar_scheduler(),
+                solve_captchas=False, http_timeout=timeout, page_load_timeout=timeout, bibitnow_timeout=timeout,
+                scholar_timeout=timeout, lean=LeanMode() if lean else None)
+
+
+def offline_scholar_scheduler() -> ScholarScheduler:
+    scheduler = ScholarScheduler(rate=1e6, burst=1000)
+    # Keeps the cookies of real Scholar sessions from being loaded into the benchmark browsers
+    scheduler.update_cookies([])
+    return scheduler
+
+
+def bench_strategies(proxy: str, pages: List[str], strategies: List[str], repeat: int, timeout: float, lean: bool):
+    with BibQuery(use_result_cache=False, **bibquery_kwargs(proxy, timeout, lean)) as bq:
+        if any(s != "http_regex_search" for s in strategies):
+            # Browser startup is reported separately instead of being attributed to the first strategy
+            start_time = time.perf_counter()
+            bq.start_browser()
+            print(f"Browser startup: {(time.perf_counter() - start_time) * 1e3:.1f} ms")
+        for strategy in strategies:
+            method = getattr(bq, f"query_{strategy}")
+            latencies = []
+            successes = 0
+            with MemorySampler() as memory:
+                start_time = time.perf_counter()
+                for _ in range(repeat):
+                    for url in pages:
+                        query_start_time = time.perf_counter()
+                        try:
+                            method(url)
+                            successes += 1
+                        except Exception:
+                            pass
+                        latencies.append(time.perf_counter() - query_start_time)
+                wall_time = time.perf_counter() - start_time
+            report(strategy, latencies, successes, wall_time, memory.peak_mb)
+
+
+def bench_batch(proxy: str, pages: List[str], repeat: int, max_workers: int, timeout: float, lean: bool):
+    latencies = []
+    successes = 0
+    with MemorySampler() as memory:
+        start_time = time.perf_counter()
+        for result in iter_query_batch(pages * repeat, use_cache=False, max_workers=max_workers, ordered=False,
+                                       **bibquery_kwargs(proxy, timeout, lean)):
+            latencies.append(result.duration)
+            successes += result.error is None
+        wall_time = time.perf_counter() - start_time
+    report(f"batch (-j {max_workers})", latencies, successes, wall_time, memory.peak_mb)
+
+
+def record(urls: List[str], path: Path):
+    manifest_path = path / "manifest.json"
+    with manifest_path.open() as f:
+        manifest = json.load(f)
+    for url in urls:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        parts = urlsplit(url)
+        file_name = f"{parts.hostname}{parts.path}".strip("/").replace("/", "_") + ".html"
+        (path / file_name).write_bytes(response.content)
+        # Snapshots are served via plain HTTP, see snapshot_proxy
+        served_url = urlunsplit(parts._replace(scheme="http"))
+        manifest = [e for e in manifest if e["url"] != served_url]
+        manifest.append({"url": served_url, "file": file_name, "content_type": "text/html", "page": True})
+        print(f"Recorded {url} to {file_name}")
+    with manifest_path.open("w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Number of passes over the pages per strategy.")
+    parser.add_argument("-s", "--strategies", nargs="+", choices=STRATEGIES, default=STRATEGIES,
+                        help="Strategies to benchmark.")
+    parser.add_argument("-j", "--max-workers", type=int, nargs="+", default=[1, 2],
+                        help="Numbers of parallel browsers to benchmark full batches with.")
+    parser.add_argument("--no-batch", action="store_true", help="Skip the batch benchmark.")
+    parser.add_argument("--lean", action="store_true", help="Run the browsers in lean mode.")
+    parser.add_argument("--timeout", type=float, default=15.0, help="Timeout in seconds for each wait.")
+    parser.add_argument("--snapshots", type=Path, default=SNAPSHOT_PATH, help="Directory of the snapshots.")
+    parser.add_argument("--record", nargs="+", metavar="URL",
+                        help="Record the given URLs as new snapshots (requires network access) instead of "
+                             "benchmarking.")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        record(args.record, args.snapshots)
+        return
+
+    snapshots, pages = load_snapshots(args.snapshots)
+    if psutil is None:
+        print("psutil is not installed, peak memory only includes this process.")
+    with snapshot_proxy(snapshots) as proxy:
+        print(f"{len(pages)} pages, {args.repeat} passes")
+        print(f"{'benchmark':<24} {'runs':>5} {'ok':>5} {'p50 [ms]':>9} {'p90 [ms]':>9} {'p99 [ms]':>9} "
+              f"{'[1/s]':>8} {'peak [MB]':>9}")
+        bench_strategies(proxy, pages, args.strategies, args.repeat, args.timeout, args.lean)
+        if not args.no_batch:
+            for max_workers in args.max_workers:
+                bench_batch(proxy, pages, args.repeat, max_workers, args.timeout, args.lean)
+
+
+if __name__ == "__main__":
+    main()
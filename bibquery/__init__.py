@@ -1,2 +1,70 @@
-from .bibquery import BibQuery, BibQueryException, CaptchaEncounteredException
-from .utils import query, query_batch
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Maps the public names to their submodules, which are only imported once a name is accessed, so that importing the
+# package does not pull in selenium, requests or asyncio
+_EXPORTS = {
+    "AsyncBibQuery": "async_bibquery",
+    "BibIndex": "bib_sync",
+    "SyncSummary": "bib_sync",
+    "canonicalize_url": "bib_sync",
+    "load_bib_index": "bib_sync",
+    "sync_bib": "bib_sync",
+    "sync_index_path": "bib_sync",
+    "DEFAULT_CACHE_PATH": "bibquery",
+    "BibQuery": "bibquery",
+    "BibQueryException": "bibquery",
+    "BrowserUnavailableException": "bibquery",
+    "CaptchaEncounteredException": "bibquery",
+    "QueryAbortedException": "bibquery",
+    "QueryResult": "bibquery",
+    "ScholarDeferredException": "bibquery",
+    "ScholarThrottledException": "bibquery",
+    "LeanMode": "lean",
+    "MetricsCollector": "metrics",
+    "StageTiming": "metrics",
+    "BibQueryPool": "pool",
+    "ArxivResolver": "resolvers",
+    "DoiResolver": "resolvers",
+    "HttpResolver": "resolvers",
+    "Resolver": "resolvers",
+    "ResolverRegistry": "resolvers",
+    "default_resolvers": "resolvers",
+    "ResultCache": "result_cache",
+    "ScholarScheduler": "scholar_scheduler",
+    "StrategyStats": "strategy_stats",
+    "iter_query_batch": "utils",
+    "query": "utils",
+    "query_batch": "utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if TYPE_CHECKING:
+    from .async_bibquery import AsyncBibQuery
+    from .bib_sync import BibIndex, SyncSummary, canonicalize_url, load_bib_index, sync_bib, sync_index_path
+    from .bibquery import DEFAULT_CACHE_PATH, BibQuery, BibQueryException, BrowserUnavailableException, \
+        CaptchaEncounteredException, QueryAbortedException, QueryResult, ScholarDeferredException, \
+        ScholarThrottledException
+    from .lean import LeanMode
+    from .metrics import MetricsCollector, StageTiming
+    from .pool import BibQueryPool
+    from .resolvers import ArxivResolver, DoiResolver, HttpResolver, Resolver, ResolverRegistry, default_resolvers
+    from .result_cache import ResultCache
+    from .scholar_scheduler import ScholarScheduler
+    from .strategy_stats import StrategyStats
+    from .utils import iter_query_batch, query, query_batch
@@ -0,0 +1,132 @@
+import heapq
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import urlparse
+
+# Schemes consisting only of these characters match exactly one domain and can be looked up in a dictionary
+LITERAL_SCHEME_PATTERN = re.compile(r"(?:[0-9a-z\-]|\\\.)+")
+# Schemes ending in a literal label, e.g. "(?:|[0-9a-z\-]+[\.]+)aappublications", can be indexed by that label
+TRAILING_LABEL_PATTERN = re.compile(r"(?:^|\\\.|\[\\\.\]\+\)|\\\.\|\))([0-9a-z\-]+)$")
+
+
+class _PathRule(NamedTuple):
+    pattern: Pattern
+    prefselector: Optional[str]
+
+
+class _Rule(NamedTuple):
+    # Position of the adjuster in the list and of the top-level domain entry within the adjuster
+    order: Tuple[int, int]
+    scheme: Pattern
+    prefselector: Optional[str]
+    paths: Optional[List[_PathRule]]
+
+
+class _DomainIndex:
+    def __init__(self):
+        self.exact: Dict[str, List[_Rule]] = {}
+        self.by_label: Dict[str, List[_Rule]] = {}
+        self.other: List[_Rule] = []
+
+    def add(self, scheme: str, rule: _Rule):
+        if LITERAL_SCHEME_PATTERN.fullmatch(scheme) is not None:
+            self.exact.setdefault(scheme.replace("\\.", "."), []).append(rule)
+            return
+        label_match = TRAILING_LABEL_PATTERN.search(scheme)
+        if label_match is not None:
+            self.by_label.setdefault(label_match.group(1), []).append(rule)
+        else:
+            self.other.append(rule)
+
+    def candidates(self, domain: str) -> List[List[_Rule]]:
+        return [self.exact.get(domain, []), self.by_label.get(domain.rsplit(".", 1)[-1], []), self.other]
+
+
+class UrlAdjusterIndex:
+    """
+    Lookup index over BibItNow's URL-specific adjuster list. Adjusters are grouped by top-level domain and, within
+    those, by their exact domain or last domain label, so that only a handful of precompiled patterns has to be tested
+    per URL. The result is the same as that of scanning the list for the first adjuster whose domain, top-level
+    domain and path all match.
+    """
+
+    def __init__(self, adjusters: List[Dict[str, Any]]):
+        self.__literal_tops: Dict[str, _DomainIndex] = {}
+        self.__pattern_tops: List[Tuple[Pattern, _DomainIndex]] = []
+        self.__pattern_top_indices: Dict[str, _DomainIndex] = {}
+        for order, adjuster in enumerate(adjusters):
+            tops = adjuster["top"]
+            if isinstance(tops, str):
+                tops = [{"scheme": tops}]
+            for top_order, top in enumerate(tops):
+                paths = top.get("path", adjuster.get("path"))
+                if isinstance(paths, str):
+                    paths = [{"scheme": paths}]
+                prefselector = top.get("prefselector", adjuster.get("prefselector"))
+                path_rules = None if paths is None else [
+                    _PathRule(re.compile(p["scheme"]), p.get("prefselector")) for p in paths]
+                rule = _Rule((order, top_order), re.compile(adjuster["scheme"]), prefselector, path_rules)
+                self.__index_for_top(top["scheme"]).add(adjuster["scheme"], rule)
+
+    def __index_for_top(self, top: str) -> _DomainIndex:
+        if LITERAL_SCHEME_PATTERN.fullmatch(top) is not None:
+            return self.__literal_tops.setdefault(top.replace("\\.", "."), _DomainIndex())
+        if top not in self.__pattern_top_indices:
+            self.__pattern_top_indices[top] = _DomainIndex()
+            self.__pattern_tops.append((re.compile(top), self.__pattern_top_indices[top]))
+        return self.__pattern_top_indices[top]
+
+    def find_prefselector(self, url: str) -> Optional[str]:
+        """
+        Determines the BibItNow prefselector to use for the given URL.
+        :param url: URL to find the prefselector for.
+        :return: The name of the prefselector or None if the matching adjuster does not specify one.
+        :raises ValueError: If no adjuster matches the URL.
+        """
+        url_parsed = urlparse(url)
+        domain, _, top = (url_parsed.hostname or "").rpartition(".")
+        if domain.startswith("www."):
+            domain = domain[4:]
+        path = url_parsed.path[1:]
+        if url_parsed.query:
+            path = f"{path}?{url_parsed.query}"
+
+        indices = [i for p, i in self.__pattern_tops if p.fullmatch(top) is not None]
+        if top in self.__literal_tops:
+            indices.append(self.__literal_tops[top])
+        candidate_lists = [c for i in indices for c in i.candidates(domain) if len(c) > 0]
+        for rule in heapq.merge(*candidate_lists):
+            if rule.scheme.fullmatch(domain) is None:
+                continue
+            if rule.paths is None:
+                return rule.prefselector
+            for path_rule in rule.paths:
+                if path_rule.pattern.match(path) is not None:
+                    return path_rule.prefselector or rule.prefselector
+        raise ValueError(f"No valid adjuster found for url {url}.")
+
+
+@lru_cache(maxsize=None)
+def load_adjuster_index(path: Path) -> UrlAdjusterIndex:
+    with path.open() as f:
+        return UrlAdjusterIndex(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def load_prefselector(prefselector_dir: Path, name: str) -> str:
+    """
+    Loads the code of a BibItNow prefselector, augmented to expose the prefselector on the window object. The result
+    is cached and shared between all BibQuery instances.
+    :param prefselector_dir: Directory containing the prefselector scripts.
+    :param name: Name of the prefselector.
+    :return: The augmented prefselector code.
+    """
+    with (prefselector_dir / f"{name}.js").open() as f:
+        prefselector_code = f.read()
+    return f"""
+        {prefselector_code}
+        window.BINPrefselector = BINPrefselector;
+        """
@@ -0,0 +1,98 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional, Set, Tuple, Union
+
+from .pool import BibQueryPool
+
+
+class AsyncBibQuery:
+    """
+    Asyncio interface to BibQuery. Queries run on a pool of BibQuery instances in worker threads, so that the event
+    loop is never blocked. Cancelling a query, e.g., because its deadline passed, aborts the underlying page load.
+    """
+
+    def __init__(self, max_concurrency: int = 4, **pool_kwargs):
+        """
+        :param max_concurrency: Maximum number of queries (and thus browsers) running at the same time.
+        :param pool_kwargs: Further keyword arguments passed on to the underlying BibQueryPool, e.g., result_cache.
+        """
+        self.__pool = BibQueryPool(max_workers=max_concurrency, **pool_kwargs)
+
+    async def __aenter__(self):
+        self.__pool.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        # Joining the workers blocks until their browsers are closed
+        await asyncio.get_running_loop().run_in_executor(None, self.__pool.close)
+
+    async def aquery(self, url: str, timeout: Optional[float] = None, **query_kwargs) -> str:
+        """
+        Queries the BibTeX of the given URL.
+        :param url: URL to get the BibTeX for.
+        :param timeout: Deadline in seconds for the query, including the time spent waiting for a free worker. None
+                        waits indefinitely.
+        :param query_kwargs: Keyword arguments passed on to BibQuery.query_detailed.
+        :return: A string containing the BibTeX for paper in the given URL.
+        :raises asyncio.TimeoutError: If the query did not finish within the deadline.
+        """
+        future = self.__pool.submit(url, **query_kwargs)
+        wrapped_future = asyncio.wrap_future(future)
+        try:
+            # The future is shielded so that cancellation goes through abort, which also stops running queries
+            result = await asyncio.wait_for(asyncio.shield(wrapped_future), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            self.__pool.abort(future)
+            # Nobody awaits the aborted query anymore, so retrieve its outcome to avoid warnings about it
+            wrapped_future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+        if result.error is not None:
+            raise result.error
+        return result.bibtex
+
+    async def aquery_batch(self, urls: Union[Iterable[str], AsyncIterable[str]], timeout: Optional[float] = None,
+                           **query_kwargs) -> AsyncIterator[Tuple[str, Union[str, BaseException]]]:
+        """
+        Queries the BibTeX of multiple URLs, yielding the results as soon as they are available. At most
+        max_concurrency URLs are in flight at any time.
+        :param urls: URLs to get the BibTeX for.
+        :param timeout: Deadline in seconds for each individual query.
+        :param query_kwargs: Keyword arguments passed on to BibQuery.query_detailed.
+        :return: An async iterator over tuples of URL and either the BibTeX string or the exception that occurred.
+        """
+        if isinstance(urls, AsyncIterable):
+            url_iter = urls.__aiter__()
+        else:
+            url_iter = self.__async_iter(urls)
+        pending: Set[asyncio.Task] = set()
+        task_urls = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.__pool.max_workers:
+                    try:
+                        url = await url_iter.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    task = asyncio.ensure_future(self.aquery(url, timeout=timeout, **query_kwargs))
+                    task_urls[task] = url
+                    pending.add(task)
+                if len(pending) == 0:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url = task_urls.pop(task)
+                    exception = task.exception()
+                    yield url, task.result() if exception is None else exception
+        finally:
+            # Reached if the consumer stops iterating early or is cancelled
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def __async_iter(urls: Iterable[str]) -> AsyncIterator[str]:
+        for url in urls:
+            yield url
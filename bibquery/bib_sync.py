@@ -0,0 +1,388 @@
+import itertools
+import json
+import logging
+import re
+import string
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple, Union
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse, urlunparse
+
+from .bibquery import BibQueryException, QueryResult
+from .bibtex_scan import extract_field, find_bibtex_entries, normalize_title
+from .metrics import MetricsCollector
+from .resolvers import ARXIV_ID_PATTERN, ARXIV_URL_PATTERN, DOI_PATTERN, DoiResolver
+from .result_cache import normalize_url
+from .utils import iter_query_batch
+
+logger = logging.getLogger("BibQuery")
+
+# Query parameters added by newsletters, social media and ad networks, which do not change the page's content
+TRACKING_PARAMETERS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "casa_token"}
+TRACKING_PARAMETER_PREFIXES = ("utm_",)
+
+# Prefix of the DOIs arXiv assigns to its preprints
+ARXIV_DOI_PREFIX = "10.48550/arxiv."
+
+# Minimum number of words of a title for it to identify a work, so that generic titles such as "Introduction" do not
+# match unrelated entries
+MIN_TITLE_WORDS = 3
+
+# DOI within the path of a publisher page, e.g., https://link.springer.com/article/10.1007/s10994-021-05946-3
+PATH_DOI_PATTERN = re.compile(r"/(10\.\d{4,9}/[^?#]+)")
+# Suffixes of the pages of a work that are appended to its DOI, such as the PDF or full text
+PATH_DOI_SUFFIX_PATTERN = re.compile(r"(\.pdf|/fulltext\.html|/abstract|/full|/pdf|/epdf|/)+$", re.IGNORECASE)
+
+# DOI of a bioRxiv or medRxiv preprint followed by the version and page of its links, e.g.,
+# https://www.biorxiv.org/content/10.1101/2020.01.01.123456v2.full
+PREPRINT_DOI_PATTERN = re.compile(
+    r"(10\.1101/(?:\d{4}\.\d{2}\.\d{2}\.)?\d{6,})(?:v\d+)?"
+    r"(?:\.(?:full|full-text|abstract|article-info|article-metrics|supplementary-material))?", re.IGNORECASE)
+
+# Query parameters holding the DOI of the page's work, on any host and on specific hosts
+DOI_QUERY_PARAMETERS = {"doi"}
+HOST_DOI_QUERY_PARAMETERS = {"journals.plos.org": {"id"}}
+
+# Suffix of the file next to the .bib file that maps the URLs queried by sync_bib to the keys of their entries
+SYNC_INDEX_SUFFIX = ".sync.jsonl"
+
+KEY_PATTERN = re.compile(r"^(@[a-z]+\s*{\s*)([^,\s]*)", re.IGNORECASE)
+
+_doi_resolver = DoiResolver()
+
+
+def arxiv_url(arxiv_id: str) -> str:
+    return f"https://arxiv.org/abs/{arxiv_id}"
+
+
+def doi_url(doi: str) -> str:
+    # DOIs are case-insensitive
+    doi = doi.lower()
+    if doi.startswith(ARXIV_DOI_PREFIX):
+        return arxiv_url(doi[len(ARXIV_DOI_PREFIX):])
+    preprint_match = PREPRINT_DOI_PATTERN.fullmatch(doi)
+    if preprint_match is not None:
+        # All versions and pages of a preprint share its DOI
+        doi = preprint_match.group(1)
+    return f"https://doi.org/{doi}"
+
+
+def _path_doi(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    match = PATH_DOI_PATTERN.search(unquote(parsed.path))
+    if match is not None:
+        doi = PATH_DOI_SUFFIX_PATTERN.sub("", match.group(1))
+        return doi if DOI_PATTERN.fullmatch(doi) is not None else None
+    # Some publishers, e.g., PLOS, pass the DOI as query parameter. Other parameters are not considered, as they may
+    # refer to other works, e.g., the one a search started from
+    host = (parsed.hostname or "").lower()
+    host = host[4:] if host.startswith("www.") else host
+    names = DOI_QUERY_PARAMETERS | HOST_DOI_QUERY_PARAMETERS.get(host, set())
+    return next((value for name, value in parse_qsl(parsed.query)
+                 if name.lower() in names and DOI_PATTERN.fullmatch(value) is not None), None)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Maps URLs of the same work to the same URL. arXiv abstract, PDF and versioned links are mapped to the abstract page,
+    doi.org links and publisher links containing a DOI to doi.org. Other URLs are normalized and stripped of tracking
+    parameters, "www." and trailing slashes, using https.
+    :param url: URL to canonicalize.
+    :return: The canonical URL.
+    """
+    url = url.strip()
+    arxiv_match = ARXIV_URL_PATTERN.search(url)
+    if arxiv_match is not None:
+        return arxiv_url(arxiv_match.group("id"))
+    doi = _doi_resolver.extract_identifier(url) or _path_doi(url)
+    if doi is not None:
+        return doi_url(doi)
+    parsed = urlparse(normalize_url(url))
+    netloc = parsed.netloc[4:] if parsed.netloc.startswith("www.") else parsed.netloc
+    query = urlencode([(name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+                       if name.lower() not in TRACKING_PARAMETERS
+                       and not name.lower().startswith(TRACKING_PARAMETER_PREFIXES)])
+    scheme = "https" if parsed.scheme == "http" else parsed.scheme
+    return urlunparse((scheme, netloc, parsed.path.rstrip("/") or "/", parsed.params, query, ""))
+
+
+def _clean_field(value: str) -> str:
+    # Removes braces and the escaping of underscores, which BibTeX requires in DOIs and URLs
+    return value.replace("{", "").replace("}", "").replace("\\_", "_").strip()
+
+
+def entry_urls(entry: str) -> Set[str]:
+    """
+    :param entry: A BibTeX entry.
+    :return: The canonical URLs of the work, derived from the url, doi and (arXiv) eprint fields of the entry.
+    """
+    urls = set()
+    url = extract_field(entry, "url")
+    if url:
+        urls.add(canonicalize_url(_clean_field(url)))
+    doi = extract_field(entry, "doi")
+    if doi:
+        doi = _clean_field(doi)
+        urls.add(canonicalize_url(doi) if doi.lower().startswith("http") else doi_url(doi))
+    eprint = extract_field(entry, "eprint")
+    if eprint:
+        archive = extract_field(entry, "archiveprefix") or extract_field(entry, "eprinttype") or "arxiv"
+        # Entries of other archives may lack the archivePrefix field, so only actual arXiv identifiers count
+        match = re.fullmatch(ARXIV_ID_PATTERN, re.sub(r"^arxiv:", "", _clean_field(eprint), flags=re.IGNORECASE))
+        if _clean_field(archive).lower() == "arxiv" and match is not None:
+            urls.add(arxiv_url(match.group("id")))
+    return urls
+
+
+def entry_title(entry: str) -> Optional[str]:
+    """
+    :param entry: A BibTeX entry.
+    :return: The normalized title of the entry, or None if it has none or it is too short to identify the work.
+    """
+    title = extract_field(entry, "title")
+    if title is None:
+        return None
+    title = normalize_title(title)
+    return title if len(title.split()) >= MIN_TITLE_WORDS else None
+
+
+def entry_key(entry: str) -> Optional[str]:
+    match = KEY_PATTERN.match(entry)
+    return match.group(2) if match is not None and match.group(2) else None
+
+
+class BibIndex:
+    """
+    Index of the entries of a .bib file by citation key, the canonical URLs of the work (see entry_urls) and normalized
+    title, used to find out which works are already in the file.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        """
+        :param entries: Initial BibTeX entries.
+        """
+        self.__keys: Set[str] = set()
+        self.__urls: Dict[str, Optional[str]] = {}
+        self.__titles: Dict[str, Optional[str]] = {}
+        self.__size = 0
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def add(self, entry: str):
+        """
+        Adds a BibTeX entry to the index.
+        :param entry: The entry.
+        """
+        key = entry_key(entry)
+        if key is not None:
+            self.__keys.add(key)
+        for url in entry_urls(entry):
+            self.__urls.setdefault(url, key)
+        title = entry_title(entry)
+        if title is not None:
+            self.__titles.setdefault(title, key)
+        self.__size += 1
+
+    def add_url(self, url: str, key: str):
+        """
+        Maps a URL to an indexed entry, e.g., a queried URL whose entry has a different url field.
+        :param url: URL of the work.
+        :param key: Citation key of the entry.
+        """
+        self.__urls.setdefault(canonicalize_url(url), key)
+
+    def contains_key(self, key: str) -> bool:
+        return key in self.__keys
+
+    def contains_url(self, url: str) -> bool:
+        """
+        :param url: URL of a work.
+        :return: Whether an indexed entry belongs to the same work, judging by its URLs.
+        """
+        return canonicalize_url(url) in self.__urls
+
+    def find(self, entry: str) -> Optional[str]:
+        """
+        Finds an entry of the same work as the given entry by its URLs or, if they do not match, its title.
+        :param entry: A BibTeX entry.
+        :return: The citation key of the indexed entry, an empty string if it has none, or None if the work is not
+                 indexed.
+        """
+        for url in entry_urls(entry):
+            if url in self.__urls:
+                return self.__urls[url] or ""
+        title = entry_title(entry)
+        if title is not None and title in self.__titles:
+            return self.__titles[title] or ""
+        return None
+
+    def unique_key(self, key: str) -> str:
+        """
+        :param key: Citation key of a new entry.
+        :return: The key, with a suffix appended if it is already used by an indexed entry.
+        """
+        if key not in self.__keys:
+            return key
+        suffixes = itertools.chain(string.ascii_lowercase, (str(i) for i in itertools.count(2)))
+        return next(f"{key}{suffix}" for suffix in suffixes if f"{key}{suffix}" not in self.__keys)
+
+
+def sync_index_path(path: Union[str, Path]) -> Path:
+    """
+    :param path: Path of a .bib file.
+    :return: Path of the file that maps the URLs synced into the .bib file to the keys of their entries.
+    """
+    path = Path(path)
+    return path.with_name(path.name + SYNC_INDEX_SUFFIX)
+
+
+def load_bib_index(path: Union[str, Path]) -> BibIndex:
+    """
+    Indexes all entries of a .bib file in a single pass over the file, along with the URLs that earlier syncs mapped to
+    them (see sync_index_path). Mappings to keys that are no longer in the file are ignored, so that works removed from
+    the file are queried again.
+    :param path: Path of the .bib file. If it does not exist, the index is empty.
+    :return: The index.
+    """
+    path = Path(path)
+    if not path.exists():
+        return BibIndex()
+    # Keep going on files that are not valid UTF-8, as only the ASCII fields matter for the index
+    index = BibIndex(find_bibtex_entries(path.read_text(encoding="utf-8", errors="replace"), any_type=True))
+    try:
+        with sync_index_path(path).open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    url, key = record["url"], record["key"]
+                except (ValueError, KeyError, TypeError):
+                    # E.g., the last line of an interrupted sync
+                    continue
+                if isinstance(url, str) and isinstance(key, str) and index.contains_key(key):
+                    index.add_url(url, key)
+    except FileNotFoundError:
+        pass
+    return index
+
+
+def _prepare_entry(bibtex: str, url: str, index: BibIndex) -> Optional[str]:
+    entry = next(find_bibtex_entries(bibtex, any_type=True), None)
+    if entry is None:
+        return None
+    key = entry_key(entry)
+    if key is not None:
+        unique_key = index.unique_key(key)
+        entry = KEY_PATTERN.sub(lambda m: m.group(1) + unique_key, entry, count=1)
+    if extract_field(entry, "url") is None:
+        # Records the queried URL, so that the next sync recognizes it
+        body = entry[:-1].rstrip()
+        entry = f"{body}{'' if body.endswith(',') else ','}\n  url = {{{url}}}\n}}"
+    return entry
+
+
+class SyncSummary(NamedTuple):
+    # Number of URLs whose work was already in the file
+    present: int = 0
+    # Number of URLs that were skipped as they are equivalent to an earlier URL of the same sync
+    coalesced: int = 0
+    # Number of entries appended to the file
+    added: int = 0
+    # Number of queried URLs whose entry turned out to be in the file already, e.g., with the same DOI or title
+    duplicates: int = 0
+    # Results of the URLs that could not be queried
+    failures: Tuple[QueryResult, ...] = ()
+
+
+def sync_bib(path: Union[str, Path], urls: Iterable[str], use_cache: bool = True, refresh: bool = False,
+             max_workers: int = 1, defer_scholar: bool = False, metrics: Optional[MetricsCollector] = None,
+             **bibquery_kwargs) -> SyncSummary:
+    """
+    Brings a .bib file up to date with a list of URLs by only querying the works that are not in the file yet.
+    Equivalent URLs, e.g., of an arXiv abstract and PDF, are queried once. The new entries are appended to the file as
+    soon as they are available, so that an interrupted sync keeps its progress, and the existing entries are left
+    untouched. Each queried URL is recorded along with the key of its new or already present entry in the file given by
+    sync_index_path, so that later syncs skip it even if the entry's fields do not contain the URL.
+    :param path: Path of the .bib file, which is created if it does not exist.
+    :param urls: URLs of the works the file should contain.
+    :param use_cache: Whether to read from and write to the result cache.
+    :param refresh: Ignore cached results but store the new results in the cache.
+    :param max_workers: Number of browsers to run in parallel.
+    :param defer_scholar: Query Google Scholar for URLs that need it only after all other URLs.
+    :param metrics: Collector to record the per-stage timings of all queries in.
+    :param bibquery_kwargs: Further keyword arguments passed on to each BibQuery instance, e.g., timeouts.
+    :return: A summary of the sync.
+    """
+    path = Path(path)
+    start_time = time.time()
+    index = load_bib_index(path)
+    logger.info(f"Indexed {len(index)} entries of {path} in {time.time() - start_time:.2f} seconds.")
+    counts = {"present": 0, "coalesced": 0, "added": 0, "duplicates": 0}
+    failures = []
+    queued: Set[str] = set()
+
+    def missing_urls() -> Iterator[str]:
+        # Lazily, so that queries start while the rest of the URLs is still being read
+        for url in urls:
+            canonical_url = canonicalize_url(url)
+            if canonical_url in queued:
+                counts["coalesced"] += 1
+            elif index.contains_url(url):
+                counts["present"] += 1
+            else:
+                queued.add(canonical_url)
+                yield url
+
+    if path.exists() and path.stat().st_size > 0:
+        with path.open("rb") as f:
+            f.seek(-1, 2)
+            separator = "\n" if f.read() == b"\n" else "\n\n"
+    else:
+        separator = ""
+    with path.open("a", encoding="utf-8") as f, ExitStack() as stack:
+        sync_index_files = []
+
+        def record_url(url: str, key: str):
+            # Entries without a key cannot be referred to, they are only recognized by their fields
+            if not key:
+                return
+            index.add_url(url, key)
+            if len(sync_index_files) == 0:
+                # Opened on demand, so that syncs without queries do not create the file
+                sync_index_files.append(stack.enter_context(sync_index_path(path).open("a", encoding="utf-8")))
+            sync_index_files[0].write(json.dumps({"url": canonicalize_url(url), "key": key}) + "\n")
+            sync_index_files[0].flush()
+
+        for result in iter_query_batch(missing_urls(), use_cache=use_cache, refresh=refresh, max_workers=max_workers,
+                                       ordered=False, defer_scholar=defer_scholar, metrics=metrics,
+                                       **bibquery_kwargs):
+            entry = _prepare_entry(result.bibtex, result.url, index) if result.error is None else None
+            if entry is None:
+                if result.error is None:
+                    result = result._replace(error=BibQueryException("Result does not contain a BibTeX entry."))
+                logger.error(f"Encountered error when trying to obtain BibTeX entry of {result.url}:\n")
+                traceback.print_exception(type(result.error), result.error, result.error.__traceback__)
+                failures.append(result)
+                continue
+            key = index.find(entry)
+            if key is not None:
+                logger.info(f"Entry of {result.url} is already in {path}" + (f" as {key}." if key else "."))
+                counts["duplicates"] += 1
+                record_url(result.url, key)
+                continue
+            f.write(f"{separator}{entry}\n")
+            f.flush()
+            separator = "\n"
+            index.add(entry)
+            record_url(result.url, entry_key(entry) or "")
+            counts["added"] += 1
+    summary = SyncSummary(failures=tuple(failures), **counts)
+    logger.info(f"Synced {path} in {time.time() - start_time:.2f} seconds: {summary.added} added, {summary.present} "
+                f"already present, {summary.coalesced} coalesced, {summary.duplicates} duplicates, "
+                f"{len(summary.failures)} failed.")
+    return summary
@@ -1,38 +1,118 @@
+import html as html_lib
 import json
 import os
 import re
+import signal
 import time
 import traceback
-from datetime import datetime, timedelta
-from difflib import SequenceMatcher
+from contextlib import contextmanager
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Optional
-
-import bibtexparser
-from regex import regex
-from selenium import webdriver
-from urllib.parse import urlparse
+from typing import TYPE_CHECKING, Callable, Collection, Iterable, Iterator, List, NamedTuple, Optional, Tuple, \
+    Union
+from urllib.parse import urlencode, urlparse
 import logging
 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.support.expected_conditions import presence_of_element_located
-from selenium.webdriver.support.wait import WebDriverWait
-from webdriver_manager.core.driver_cache import DriverCacheManager
-from webdriver_manager.firefox import GeckoDriverManager
+from .adjusters import load_adjuster_index, load_prefselector
+from .bibtex_scan import best_matching_entry
+from .lean import CONTENT_PREFERENCES, SET_PREFERENCES_SCRIPT, LeanMode
+from .metrics import StageTiming, TimingHook
+from .resolvers import ResolverRegistry, default_resolvers
+from .result_cache import ResultCache
+from .scholar_scheduler import ScholarScheduler, default_scholar_scheduler
+from .startup import ProfileTemplate, firefox_environment, resolve_driver_path
+from .strategy_stats import StrategyStats
+
+if TYPE_CHECKING:
+    # Selenium and requests are only imported once a browser or session is needed, which keeps imports cheap
+    import requests
+    from selenium.webdriver.remote.webdriver import WebDriver
+    from selenium.webdriver.remote.webelement import WebElement
 
 logger = logging.getLogger("BibQuery")
 
-# Delete all SNAP-related environment variables as they mess with selenium
-keys = list(os.environ.keys())
-for key in keys:
-    if key.lower().startswith("snap"):
-        del os.environ[key]
-
-# Disable annoying webdriver manager outputs
-os.environ["WDM_PROGRESS_BAR"] = "0"
+DEFAULT_CACHE_PATH = Path("~").expanduser() / ".cache" / "bibquery"
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+SCHOLAR_URL = "https://scholar.google.com"
+
+# Maximum number of bytes of a page read by the HTTP strategy. Pages are cut off beyond, as BibTeX entries appear in
+# the first few MB of even the largest publisher pages.
+MAX_HTTP_CONTENT_LENGTH = 8 * 2 ** 20
+
+# Parts of WebDriver error messages meaning that Firefox is gone while geckodriver is still running
+DEAD_BROWSER_MESSAGES = ("without establishing a connection", "Failed to decode response from marionette")
+
+# Margin on top of the in-page timeouts, so that the scripts below time out before WebDriver does
+SCRIPT_TIMEOUT_MARGIN = 10.0
+
+# Resolves with [index, element] for the first of the given XPath expressions matching an element as soon as it
+# appears in the document, or with null after the given timeout (in milliseconds).
+WAIT_FOR_ANY_ELEMENT_SCRIPT = """
+const [xpaths, timeout, done] = arguments;
+const find = () => {
+    for (let i = 0; i < xpaths.length; i++) {
+        const node = document.evaluate(
+            xpaths[i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (node !== null) {
+            return [i, node];
+        }
+    }
+    return null;
+};
+const initial = find();
+if (initial !== null) {
+    done(initial);
+    return;
+}
+const observer = new MutationObserver(() => {
+    const result = find();
+    if (result !== null) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(result);
+    }
+});
+const timer = setTimeout(() => {
+    observer.disconnect();
+    done(null);
+}, timeout);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+"""
+
+# Resolves with the value of the element matching the given XPath expression once it is non-empty and not one of the
+# given placeholder values, or with null after the given timeout (in milliseconds). Assignments to the value property
+# do not cause DOM mutations, so in addition to the observer the value is checked on an in-page timer, which does not
+# cause any WebDriver traffic.
+WAIT_FOR_VALUE_SCRIPT = """
+const [xpath, placeholders, timeout, done] = arguments;
+let finished = false;
+const finish = (value) => {
+    if (!finished) {
+        finished = true;
+        observer.disconnect();
+        clearInterval(interval);
+        clearTimeout(timer);
+        done(value);
+    }
+};
+const check = () => {
+    const element = document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (element !== null && element.value && !placeholders.includes(element.value)) {
+        finish(element.value);
+    }
+};
+const observer = new MutationObserver(check);
+const interval = setInterval(check, 50);
+const timer = setTimeout(() => finish(null), timeout);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+check();
+"""
 
 
 class BibQueryException(Exception):
@@ -43,14 +123,113 @@ class CaptchaEncounteredException(Exception):
     pass
 
 
+class QueryAbortedException(Exception):
+    pass
+
+
+class ScholarDeferredException(BibQueryException):
+    pass
+
+
+class ScholarThrottledException(BibQueryException):
+    pass
+
+
+class BrowserUnavailableException(Exception):
+    pass
+
+
+class QueryResult(NamedTuple):
+    url: str
+    bibtex: Optional[str] = None
+    # Name of the strategy that produced the BibTeX
+    strategy: Optional[str] = None
+    # Whether the result was taken from the result cache
+    cached: bool = False
+    # Time in seconds the query took
+    duration: float = 0.0
+    # Exception that occurred if the query failed
+    error: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
 class BibQuery:
-    def __init__(self):
-        self.__browser: Optional[WebDriver] = None
+    def __init__(self, result_cache: Optional[ResultCache] = None, use_result_cache: bool = True,
+                 strategy_stats: Optional[StrategyStats] = None, use_strategy_stats: bool = True,
+                 resolvers: Optional[ResolverRegistry] = None, http_timeout: float = 10.0,
+                 page_load_timeout: Optional[float] = None, bibitnow_timeout: float = 60.0,
+                 scholar_timeout: float = 60.0, scholar_scheduler: Optional[ScholarScheduler] = None,
+                 solve_captchas: bool = True, timing_hooks: Optional[Iterable[TimingHook]] = None,
+                 proxy: Optional[str] = None, scholar_url: str = SCHOLAR_URL, lean: Optional[LeanMode] = None,
+                 use_profile_template: bool = True):
+        """
+        :param result_cache: Cache to store query results in. If None and use_result_cache is set, a cache in the
+                             default cache directory is opened, which close closes again.
+        :param use_result_cache: Whether to cache query results at all.
+        :param strategy_stats: Statistics used to order the query strategies per domain. If None and
+                               use_strategy_stats is set, statistics in the default cache directory are opened, which
+                               close closes again.
+        :param use_strategy_stats: Whether to record statistics and order the strategies based on them. If not set,
+                                   the strategies are always tried in their default order.
+        :param resolvers: Resolvers fetching the BibTeX of URLs with known identifiers directly, which are consulted
+                          before all other strategies. If None, the built-in arXiv and DOI resolvers are used. Pass an
+                          empty registry to disable them.
+        :param http_timeout: Timeout in seconds for plain HTTP requests, which are tried before using the browser.
+        :param page_load_timeout: Timeout in seconds for page loads in the browser. None keeps the WebDriver default.
+        :param bibitnow_timeout: Timeout in seconds for BibItNow to produce the BibTeX entry once the page is loaded.
+        :param scholar_timeout: Timeout in seconds for each element to appear on Google Scholar.
+        :param scholar_scheduler: Rate limiter for Google Scholar queries. If None, the scheduler shared by all
+                                  instances of this process is used.
+        :param solve_captchas: Whether to open a visible browser for the user to solve Google Scholar captchas. If not
+                               set, the Scholar strategy fails on a captcha and Scholar queries pause for a cool-down.
+        :param timing_hooks: Callbacks receiving a StageTiming for each stage of the queries, e.g., a MetricsCollector.
+        :param proxy: HTTP proxy ("host:port") for all requests of the browser and of the HTTP strategies, e.g., to
+                      serve recorded pages in benchmarks.
+        :param scholar_url: Base URL of Google Scholar.
+        :param lean: Configuration of lean browsing, which skips images, fonts, media and tracker domains and finishes
+                     page loads once the document is parsed. If None, pages are loaded completely.
+        :param use_profile_template: Whether to start browsers from a copy of a Firefox profile that is prepared once in
+                                     the cache directory instead of letting Firefox create a new profile each time.
+        """
+        self.__browser: Optional["WebDriver"] = None
+        self.__abort_requested = False
+        self.__session: Optional["requests.Session"] = None
+        self.__http_timeout = http_timeout
+        self.__page_load_timeout = page_load_timeout
+        self.__bibitnow_timeout = bibitnow_timeout
+        self.__scholar_timeout = scholar_timeout
+        self.__scholar_scheduler = scholar_scheduler if scholar_scheduler is not None else default_scholar_scheduler()
+        self.__solve_captchas = solve_captchas
+        self.__scholar_cookie_generation = 0
+        self.__timing_hooks: List[TimingHook] = list(timing_hooks or [])
+        self.__current_url: Optional[str] = None
+        # URL of the page loaded by a strategy of the current query, which the following strategies can reuse
+        self.__loaded_url: Optional[str] = None
+        self.__proxy = proxy
+        self.__scholar_url = scholar_url.rstrip("/")
+        self.__lean = lean
+        self.__lean_relaxed = False
         self.__res_path = Path(__file__).parent / "res"
-        self.__cache_path = Path("~").expanduser() / ".cache" / "bibquery"
+        self.__cache_path = DEFAULT_CACHE_PATH
+        # Cache and statistics created by this instance, which it closes again, unlike those passed in
+        self.__owned_stores: List[Union[ResultCache, StrategyStats]] = []
+        if result_cache is None and use_result_cache:
+            result_cache = ResultCache(self.__cache_path / "results.sqlite")
+            self.__owned_stores.append(result_cache)
+        self.__result_cache = result_cache if use_result_cache else None
+        if strategy_stats is None and use_strategy_stats:
+            strategy_stats = StrategyStats(self.__cache_path / "strategy_stats.sqlite")
+            self.__owned_stores.append(strategy_stats)
+        self.__strategy_stats = strategy_stats if use_strategy_stats else None
+        self.__resolvers = resolvers if resolvers is not None else default_resolvers()
         self.__cookie_path = self.__cache_path / "google_cookies.json"
-        with (self.__res_path / "urlSpecificAdjusterList.json").open() as f:
-            self.__url_specific_adjusters = json.load(f)
+        self.__addon_path = self.__res_path / "bibitnow_patched.xpi"
+        self.__profile_template = ProfileTemplate(self.__cache_path / "profile_template", self.__addon_path) \
+            if use_profile_template else None
+        self.__url_adjusters = load_adjuster_index(self.__res_path / "urlSpecificAdjusterList.json")
 
     def __enter__(self):
         self.initialize()
@@ -60,169 +239,534 @@ class BibQuery:
         self.close()
 
     def initialize(self):
-        options = Options()
-        options.add_argument("--headless")
-        self.__cache_path.mkdir(exist_ok=True, parents=True)
+        """
+        Prepares this instance for querying. The browser itself is only started once the first query needs it.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
 
-        # Workaround for the GitHub rate limit issue (https://github.com/SergeyPirogov/webdriver_manager/issues/442)
-        driver_filename = None
-        drivers_json_path = self.__cache_path / ".wdm" / "drivers.json"
-        if drivers_json_path.exists():
-            with drivers_json_path.open() as f:
-                drivers_dict = json.load(f)
-            max_cache_age = timedelta(days=1)
-            for name, properties in drivers_dict.items():
-                timestamp = datetime.strptime(properties["timestamp"], "%d/%m/%Y")
-                if timestamp - datetime.today() < max_cache_age:
-                    driver_filename = properties["binary_path"]
-        if driver_filename is None:
-            cache_manager = DriverCacheManager(self.__cache_path)
-            driver_filename = GeckoDriverManager(cache_manager=cache_manager).install()
+        self.__cache_path.mkdir(exist_ok=True, parents=True)
+        self.__session = requests.Session()
+        self.__session.headers.update(HTTP_HEADERS)
+        if self.__proxy is not None:
+            self.__session.proxies.update({"http": f"http://{self.__proxy}", "https": f"http://{self.__proxy}"})
+        # Keep a few connections per host alive, so that consecutive requests to the same publisher reuse them
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=4)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+
+    @property
+    def initialized(self) -> bool:
+        return self.__session is not None
+
+    @property
+    def browser_started(self) -> bool:
+        return self.__browser is not None
+
+    def __get_browser(self) -> "WebDriver":
+        if not self.initialized:
+            raise ValueError("BibQuery has not been initialized or was already closed.")
+        if self.__browser is None:
+            try:
+                self.start_browser()
+            except Exception as e:
+                # A missing Firefox or geckodriver or a failed driver download says nothing about the URL
+                raise BrowserUnavailableException(f"Failed to start the browser ({type(e).__name__}: {e})") from e
+        return self.__browser
 
+    def start_browser(self):
+        """
+        Starts the browser right away instead of on the first query that needs it.
+        """
+        if not self.initialized:
+            raise ValueError("BibQuery has not been initialized or was already closed.")
+        if self.__browser is not None:
+            return
         self.__tmp_dir = TemporaryDirectory(prefix=str(Path.home() / "bibquery_tmp"))
-        self.__browser = webdriver.Firefox(
-            service=webdriver.FirefoxService(
-                executable_path=driver_filename, log_output=os.devnull,
-                env={**os.environ, "TMPDIR": str(self.__tmp_dir.name)}),
-            options=options)
-        self.__browser.install_addon(self.__res_path / "bibitnow_patched.xpi", temporary=True)
-        if self.__cookie_path.exists():
-            with self.__cookie_path.open() as f:
-                cookies = json.load(f)
-            self.__browser.get("https://scholar.google.com/")
-            self.__browser.delete_all_cookies()
-            for cookie in cookies:
-                self.__browser.add_cookie(cookie)
+        try:
+            profile_path, addon_installed = self.__prepare_profile(Path(self.__tmp_dir.name))
+            self.__browser = self.__create_firefox(
+                tmp_dir=self.__tmp_dir.name, lean=self.__lean, profile_path=profile_path)
+            self.__lean_relaxed = False
+            if not addon_installed:
+                with self.__timed("addon_install"):
+                    self.__browser.install_addon(self.__addon_path, temporary=True)
+        except Exception:
+            # Do not leave a half-started browser behind, the next query that needs one tries again
+            self.__discard_browser()
+            self.__tmp_dir.cleanup()
+            raise
+        # Scholar cookies are applied before the first Scholar query of the new browser
+        self.__scholar_cookie_generation = 0
+        self.__loaded_url = None
+
+    def __prepare_profile(self, tmp_path: Path) -> Tuple[Optional[Path], bool]:
+        # Returns the profile to start the browser with (None for a new one) and whether the addon is installed in it
+        if self.__profile_template is None:
+            return None, False
+        with self.__timed("profile_setup"):
+            try:
+                addon_installed = self.__profile_template.ensure(self.__build_profile_template)
+                profile_path = tmp_path / "profile"
+                self.__profile_template.copy_to(profile_path)
+            except Exception:
+                logger.warning("Failed to prepare the Firefox profile template, starting with a new profile.",
+                               exc_info=True)
+                return None, False
+        return profile_path, addon_installed
+
+    def __build_profile_template(self, profile_path: Path) -> bool:
+        from selenium.common.exceptions import WebDriverException
+
+        # Firefox persists the preferences it was started with, so the proxy of this instance is left out
+        browser = self.__create_firefox(profile_path=profile_path, use_proxy=False)
+        try:
+            browser.install_addon(self.__addon_path, temporary=False)
+            return True
+        except WebDriverException:
+            # Release builds of Firefox only install signed addons permanently, which the patched addon is not
+            logger.info("Firefox refused to install the BibItNow addon permanently, installing it for each browser.")
+            return False
+        finally:
+            browser.quit()
+
+    def __create_firefox(self, headless: bool = True, tmp_dir: Optional[str] = None, lean: Optional[LeanMode] = None,
+                         profile_path: Optional[Path] = None, use_proxy: bool = True) -> "WebDriver":
+        from selenium import webdriver
+        from selenium.webdriver.firefox.options import Options
+
+        options = Options()
+        if headless:
+            options.add_argument("--headless")
+        if profile_path is not None:
+            options.add_argument("-profile")
+            options.add_argument(str(profile_path))
+            # Keeps the addon installed in the template enabled on builds that support unsigned addons, see
+            # __build_profile_template. Release builds ignore it.
+            options.set_preference("xpinstall.signatures.required", False)
+        if use_proxy and self.__proxy is not None:
+            host, port = self.__proxy.rsplit(":", 1)
+            for scheme in ["http", "ssl"]:
+                options.set_preference(f"network.proxy.{scheme}", host)
+                options.set_preference(f"network.proxy.{scheme}_port", int(port))
+            options.set_preference("network.proxy.type", 1)
+            options.set_preference("network.proxy.no_proxies_on", "")
+            options.set_preference("network.proxy.allow_hijacking_localhost", True)
+            # Plain HTTP URLs must not be upgraded, as proxied HTTPS connections cannot be served by a local proxy
+            options.set_preference("dom.security.https_first", False)
+        if lean is not None:
+            for name, value in lean.preferences(self.__proxy).items():
+                options.set_preference(name, value)
+            if lean.eager:
+                options.page_load_strategy = "eager"
+            if len(lean.allowed_domains) > 0:
+                # Needed to change preferences in the chrome context on allowed domains
+                options.add_argument("-remote-allow-system-access")
+        with self.__timed("driver_resolution"):
+            driver_path = resolve_driver_path(self.__cache_path)
+        with self.__timed("browser_launch"):
+            browser = webdriver.Firefox(
+                service=webdriver.FirefoxService(
+                    executable_path=driver_path, log_output=os.devnull, env=firefox_environment(tmp_dir)),
+                options=options)
+        self.__configure_timeouts(browser)
+        return browser
 
     def close(self):
-        self.__browser.close()
-        self.__tmp_dir.cleanup()
+        if self.__browser is not None:
+            # quit also stops the geckodriver process, which matters when browsers are restarted in long-running pools
+            self.__browser.quit()
+            self.__browser = None
+            self.__tmp_dir.cleanup()
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+        for store in self.__owned_stores:
+            store.close()
+        self.__owned_stores.clear()
+
+    def abort(self):
+        """
+        Aborts the query currently running in another thread by killing the browser, which makes any pending page load
+        or script fail immediately. The aborted query raises a QueryAbortedException and the browser is restarted by
+        the next query that needs it.
+        """
+        self.__abort_requested = True
+        browser = self.__browser
+        if browser is not None:
+            process_id = browser.capabilities.get("moz:processID")
+            if process_id is not None:
+                try:
+                    os.kill(process_id, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def __discard_browser(self):
+        if self.__browser is not None:
+            try:
+                self.__browser.quit()
+            except Exception:
+                logger.debug("Failed to quit browser.", exc_info=True)
+            self.__browser = None
+            self.__tmp_dir.cleanup()
+            self.__loaded_url = None
+
+    def __check_aborted(self):
+        if self.__abort_requested:
+            self.__abort_requested = False
+            self.__discard_browser()
+            raise QueryAbortedException("Query was aborted.")
+
+    def __configure_timeouts(self, browser: "WebDriver"):
+        if self.__page_load_timeout is not None:
+            browser.set_page_load_timeout(self.__page_load_timeout)
+        browser.set_script_timeout(max(self.__bibitnow_timeout, self.__scholar_timeout) + SCRIPT_TIMEOUT_MARGIN)
+
+    @staticmethod
+    def __wait_for_any(browser: "WebDriver", xpaths: List[str], timeout: float) -> Optional[Tuple[int, "WebElement"]]:
+        result = browser.execute_async_script(WAIT_FOR_ANY_ELEMENT_SCRIPT, xpaths, int(timeout * 1000))
+        return None if result is None else (result[0], result[1])
+
+    def __wait_and_get(self, browser: "WebDriver", xpath: str, timeout: float) -> "WebElement":
+        result = self.__wait_for_any(browser, [xpath], timeout)
+        if result is None:
+            raise TimeoutError(f"Timed out waiting for element \"{xpath}\" to appear.")
+        return result[1]
+
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        return self.__result_cache
+
+    @property
+    def strategy_stats(self) -> Optional[StrategyStats]:
+        return self.__strategy_stats
+
+    @property
+    def resolvers(self) -> ResolverRegistry:
+        return self.__resolvers
+
+    @property
+    def scholar_scheduler(self) -> ScholarScheduler:
+        return self.__scholar_scheduler
+
+    def add_timing_hook(self, hook: TimingHook):
+        """
+        Registers a callback receiving a StageTiming for each stage of the following queries.
+        :param hook: The callback. It is called from the thread running the query and should return quickly.
+        """
+        self.__timing_hooks.append(hook)
+
+    def remove_timing_hook(self, hook: TimingHook):
+        self.__timing_hooks.remove(hook)
+
+    def __emit_timing(self, stage: str, duration: float, strategy: Optional[str] = None, success: bool = True):
+        if len(self.__timing_hooks) == 0:
+            return
+        timing = StageTiming(stage, duration, self.__current_url, strategy, success)
+        for hook in self.__timing_hooks:
+            try:
+                hook(timing)
+            except Exception:
+                logger.debug(f"Timing hook {hook} failed.", exc_info=True)
 
-    def __wait_and_get(self, driver: WebDriver, by: str, value: Optional[str] = None, timeout: float = 60.0):
-        WebDriverWait(driver, timeout).until(presence_of_element_located((by, value)))
-        return driver.find_element(by, value)
+    @contextmanager
+    def __timed(self, stage: str, strategy: Optional[str] = None) -> Iterator[None]:
+        start_time = time.time()
+        success = False
+        try:
+            yield
+            success = True
+        finally:
+            self.__emit_timing(stage, time.time() - start_time, strategy, success)
 
-    def query(self, url: str) -> str:
+    def query(self, url: str, use_cache: bool = True, refresh: bool = False) -> str:
         """
-        Tries to load the BibTeX of the paper behind the URL first using the query_bibitnow method and if that fails,
-        falling back to query_google_scholar.
+        Loads the BibTeX of the paper behind the URL. See query_detailed for details.
         :param url: URL to get the BibTeX for.
+        :param use_cache: Whether to read from and write to the result cache.
+        :param refresh: Ignore cached results but store the new result in the cache.
         :return: A string containing the BibTeX for paper in the given URL.
         """
+        return self.query_detailed(url, use_cache=use_cache, refresh=refresh).bibtex
+
+    def query_detailed(self, url: str, use_cache: bool = True, refresh: bool = False, defer_scholar: bool = False,
+                       strategies: Optional[Collection[str]] = None) -> QueryResult:
+        """
+        Tries to load the BibTeX of the paper behind the URL first using the resolvers matching the URL, then the
+        query_http_regex_search and query_regex_search methods, then query_bibitnow and if all fail, falling back to
+        query_google_scholar. If strategy statistics are used, this order is adapted per domain to try the strategies
+        that succeed fastest first. Results, including failures, are stored in the result cache.
+        :param url: URL to get the BibTeX for.
+        :param use_cache: Whether to read from and write to the result cache.
+        :param refresh: Ignore cached results but store the new result in the cache.
+        :param defer_scholar: Raise a ScholarDeferredException instead of querying Google Scholar if all other
+                              strategies fail, so that the caller can query Scholar later, e.g., at the end of a batch.
+        :param strategies: Names of the strategies and resolvers to try. If None, all of them are tried.
+        :return: The query result containing the BibTeX for paper in the given URL and the strategy that produced it.
+        """
+        start_time = time.time()
+        self.__current_url = url
+        # Pages loaded by previous queries might be outdated
+        self.__loaded_url = None
+        result = None
+        try:
+            result = self.__query_detailed(url, use_cache, refresh, defer_scholar, strategies, start_time)
+            return result
+        finally:
+            self.__emit_timing("query", time.time() - start_time, None if result is None else result.strategy,
+                               result is not None)
+            self.__current_url = None
+
+    def __query_detailed(self, url: str, use_cache: bool, refresh: bool, defer_scholar: bool,
+                         strategies: Optional[Collection[str]], start_time: float) -> QueryResult:
+        cache = self.__result_cache if use_cache else None
+        if cache is not None and not refresh:
+            lookup_start_time = time.time()
+            entry = cache.get(url)
+            self.__emit_timing("cache_lookup", time.time() - lookup_start_time, success=entry is not None)
+            if entry is not None:
+                if entry.is_failure:
+                    raise BibQueryException(f"Failed to load BibTeX for URL \"{url}\" (cached failure)")
+                logger.debug(f"Using cached BibTeX for {url} obtained via {entry.strategy}.")
+                return QueryResult(url, entry.bibtex, entry.strategy, cached=True, duration=time.time() - start_time)
+        if not self.initialized:
+            raise ValueError("BibQuery has not been initialized or was already closed.")
+        if self.__abort_requested:
+            # An abort arrived after the previous query had already finished, so only the browser needs replacing
+            self.__abort_requested = False
+            self.__discard_browser()
         try:
-            return self.query_regex_search(url)
-        except:
-            logger.debug(f"Failed to obtain BibTeX using RegEx-Search with the following "
-                         f"exception:\n{traceback.format_exc()}")
+            bibtex, strategy = self.__query_uncached(url, defer_scholar, strategies)
+        except BibQueryException as e:
+            # Deferred and throttled queries have not failed yet
+            if cache is not None and not isinstance(e, (ScholarDeferredException, ScholarThrottledException)):
+                cache.put_failure(url, str(e))
+            raise
+        if cache is not None:
+            cache.put(url, bibtex, strategy)
+        return QueryResult(url, bibtex, strategy, duration=time.time() - start_time)
+
+    def __query_uncached(self, url: str, defer_scholar: bool = False,
+                         strategies: Optional[Collection[str]] = None) -> Tuple[str, str]:
+        # Tuples of name, display name, stage, function and whether it uses the browser of each attempt. Resolvers come
+        # first, in registration order and never reordered by the strategy statistics, as they cost a single HTTP
+        # request. A failing resolver (no BibTeX, HTTP error, timeout) falls through to the next attempt like any
+        # failing strategy.
+        attempts: List[Tuple[str, str, str, Callable[[], str], bool]] = []
+        for resolver, identifier in self.__resolvers.matching(url):
+            if strategies is None or resolver.name in strategies:
+                attempts.append((resolver.name, f"resolver {resolver.name} for \"{identifier}\"", "resolver",
+                                 lambda r=resolver, i=identifier: r.fetch(i, self.__session, self.__http_timeout),
+                                 False))
+        methods = {
+            "http_regex_search": ("RegEx-Search over HTTP", self.query_http_regex_search),
+            "regex_search": ("RegEx-Search", self.query_regex_search),
+            "bibitnow": ("BibItNow", self.query_bibitnow),
+            "google_scholar": ("Google Scholar", self.query_google_scholar),
+        }
+        order = [s for s in methods if strategies is None or s in strategies]
+        if self.__strategy_stats is not None:
+            order = self.__strategy_stats.order(url, order)
+        deferred = defer_scholar and "google_scholar" in order
+        if deferred:
+            order.remove("google_scholar")
+        for strategy in order:
+            display_name, method = methods[strategy]
+            attempts.append((strategy, display_name, "strategy", lambda m=method: m(url),
+                             strategy != "http_regex_search"))
+        failed: Optional[Tuple[str, float]] = None
+        browser_error: Optional[BrowserUnavailableException] = None
+        throttled = False
+        for name, display_name, stage, attempt, uses_browser in attempts:
+            if uses_browser and browser_error is not None:
+                continue
+            if failed is not None:
+                # The time lost on the failed attempt before falling back to this one
+                self.__emit_timing("fallback", failed[1], f"{failed[0]}->{name}")
+            logger.debug(f"Trying with {display_name}...")
+            start_time = time.time()
             try:
-                return self.query_bibitnow(url)
-            except:
-                logger.debug(f"Failed to obtain BibTeX using BibItNow with the following "
+                bibtex = self.__attempt_in_live_browser(attempt, display_name) if uses_browser else attempt()
+            except BrowserUnavailableException as e:
+                # Skip the other browser strategies, but still try the ones without a browser
+                self.__check_aborted()
+                logger.debug(f"Skipping browser strategies for {url}: {e}")
+                browser_error = e
+            except CaptchaEncounteredException:
+                # Scholar throttles all queries, which says nothing about the URL, so neither the statistics nor the
+                # result cache record a failure
+                self.__check_aborted()
+                failed = (name, time.time() - start_time)
+                self.__emit_timing(stage, failed[1], name, False)
+                throttled = True
+            except Exception:
+                self.__check_aborted()
+                logger.debug(f"Failed to obtain BibTeX using {display_name} with the following "
                              f"exception:\n{traceback.format_exc()}")
-                try:
-                    logger.debug(f"Trying with Google Scholar...")
-                    return self.query_google_scholar(url)
-                except:
-                    logger.debug(f"Failed to obtain BibTeX using Google Scholar with the following "
-                                 f"exception:\n{traceback.format_exc()}")
-                    raise BibQueryException(f"Failed to load BibTeX for URL \"{url}\"")
-
-    def query_regex_search(self, url: str):
-        if self.__browser is None:
+                failed = (name, time.time() - start_time)
+                self.__record_outcome(url, name, stage, False, failed[1])
+            else:
+                self.__check_aborted()
+                self.__record_outcome(url, name, stage, True, time.time() - start_time)
+                return bibtex, name
+        if browser_error is not None:
+            # Not a BibQueryException, so that the URL is not negative-cached although its strategies did not run
+            raise browser_error
+        if throttled:
+            raise ScholarThrottledException(f"Failed to load BibTeX for URL \"{url}\", Google Scholar asked for a "
+                                            f"captcha. Retry after the cool-down.")
+        if deferred:
+            raise ScholarDeferredException(f"Deferred querying Google Scholar for URL \"{url}\"")
+        raise BibQueryException(f"Failed to load BibTeX for URL \"{url}\"")
+
+    def __attempt_in_live_browser(self, attempt: Callable[[], str], display_name: str) -> str:
+        # A crashed Firefox or geckodriver says nothing about the strategy, so it is retried once in a new browser
+        try:
+            return attempt()
+        except Exception as e:
+            if self.__abort_requested or not self.__is_browser_dead(e):
+                raise
+            logger.warning(f"Browser died during {display_name} ({type(e).__name__}), restarting it.")
+        self.__discard_browser()
+        try:
+            return attempt()
+        except Exception as e:
+            if self.__abort_requested or not self.__is_browser_dead(e):
+                raise
+            self.__discard_browser()
+            raise BrowserUnavailableException(f"Browser died twice during {display_name}.") from e
+
+    @staticmethod
+    def __is_browser_dead(e: Exception) -> bool:
+        from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, WebDriverException
+        from urllib3.exceptions import MaxRetryError, ProtocolError
+
+        # Connection errors come from geckodriver being gone, the others from Firefox or its window being gone
+        if isinstance(e, (InvalidSessionIdException, NoSuchWindowException, MaxRetryError, ProtocolError,
+                          ConnectionError)):
+            return True
+        return isinstance(e, WebDriverException) and any(m in str(e) for m in DEAD_BROWSER_MESSAGES)
+
+    def __record_outcome(self, url: str, strategy: str, stage: str, success: bool, duration: float):
+        self.__emit_timing(stage, duration, strategy, success)
+        if self.__strategy_stats is not None:
+            self.__strategy_stats.record(url, strategy, success, duration)
+
+    def query_http_regex_search(self, url: str) -> str:
+        """
+        Searches the static HTML of the page behind the URL for BibTeX entries without starting a browser. Works for
+        pages that contain the BibTeX in their markup, e.g., arXiv or the ACL Anthology.
+        :param url: URL to get the BibTeX for.
+        :return: A string containing the BibTeX for paper in the given URL.
+        """
+        if not self.initialized:
             raise ValueError("BibQuery has not been initialized or was already closed.")
-        self.__browser.get(url)
-        html = self.__browser.find_element(By.XPATH, "/html/body").get_attribute("innerHTML")
-        bibtex_types = [
-            "article", "book", "booklet", "conference", "inbook", "incollection", "inproceedings", "manual",
-            "mastersthesis", "misc", "phdthesis", "proceedings", "techreport", "unpublished"]
-        candidates = regex.findall(f"(@(?:{'|'.join(bibtex_types)})(?P<yolo>{{(?:[^{{}}]+|(?&yolo))*}}))", html)
-
-        scores = {}
-        for c, *_ in candidates:
-            citation = bibtexparser.loads(c)
-            if len(citation.entries) == 1:
-                title = citation.entries[0].get("title")
-                matcher = SequenceMatcher(None, title, self.__browser.title)
-                largest_block = max(matcher.get_matching_blocks(), key=lambda m: m.size)
-                if (largest_block.size / len(title) > 0.5 or largest_block.size / len(self.__browser.title) > 0.5 and
-                        largest_block.size / len(title) > 0.15):
-                    scores[c] = largest_block.size / len(title)
-        if len(scores) == 0:
+        with self.__timed("http_request", "http_regex_search"):
+            # Streamed, so that PDFs and other binary files are rejected based on their headers without downloading them
+            with self.__session.get(url, timeout=self.__http_timeout, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith(("text/", "application/xhtml")):
+                    raise BibQueryException(f"Unsupported content type \"{content_type}\".")
+                content = bytearray()
+                for chunk in response.iter_content(chunk_size=65536):
+                    content += chunk
+                    if len(content) >= MAX_HTTP_CONTENT_LENGTH:
+                        logger.debug(f"Truncated {url} after {len(content)} bytes.")
+                        break
+                # Without a charset in the headers, requests would assume ISO-8859-1 for all text types
+                encoding = response.encoding if "charset" in content_type.lower() else "utf-8"
+        try:
+            html = bytes(content).decode(encoding or "utf-8", errors="replace")
+        except LookupError:
+            # Unknown charset in the headers
+            html = bytes(content).decode("utf-8", errors="replace")
+        title_match = re.search(r"<title[^>]*>([^<]*)</title>", html, re.IGNORECASE)
+        title = html_lib.unescape(title_match.group(1)).strip() if title_match is not None else ""
+        return self.__extract_bibtex(html, title, "http_regex_search")
+
+    def __load_page(self, browser: "WebDriver", url: str, strategy: str, reuse: bool = False):
+        """
+        Navigates the browser to the URL.
+        :param browser: The browser.
+        :param url: URL to load.
+        :param strategy: Strategy loading the page, for the timing hooks.
+        :param reuse: Whether the page may be shared with other strategies of the current query. If it was already
+                      loaded by one of them, it is not loaded again.
+        """
+        if reuse and url == self.__loaded_url and browser is self.__browser:
+            # A previous strategy might have left the browser inside a frame
+            browser.switch_to.default_content()
+            return
+        self.__loaded_url = None
+        if browser is self.__browser and self.__lean is not None and self.__lean.block_content:
+            self.__relax_lean_mode(browser, self.__lean.allows(url))
+        with self.__timed("page_load", strategy):
+            browser.get(url)
+        if reuse and browser is self.__browser:
+            self.__loaded_url = url
+
+    def __relax_lean_mode(self, browser: "WebDriver", relaxed: bool):
+        if relaxed == self.__lean_relaxed:
+            return
+        preferences = {name: None if relaxed else value for name, value in CONTENT_PREFERENCES.items()}
+        with browser.context(browser.CONTEXT_CHROME):
+            browser.execute_script(SET_PREFERENCES_SCRIPT, preferences)
+        self.__lean_relaxed = relaxed
+
+    def query_regex_search(self, url: str) -> str:
+        """
+        Searches the rendered HTML of the page behind the URL for BibTeX entries. Reuses the page if another
+        strategy of the current query already loaded it.
+        :param url: URL to get the BibTeX for.
+        :return: A string containing the BibTeX for paper in the given URL.
+        """
+        browser = self.__get_browser()
+        self.__load_page(browser, url, "regex_search", reuse=True)
+        html = browser.find_element("xpath", "/html/body").get_attribute("innerHTML")
+        return self.__extract_bibtex(html, browser.title, "regex_search")
+
+    def __extract_bibtex(self, html: str, page_title: str, strategy: str) -> str:
+        with self.__timed("extraction", strategy):
+            bibtex = best_matching_entry(html, page_title)
+        if bibtex is None:
             raise BibQueryException("No BibTeX entries found on the page.")
-        return max(scores, key=scores.get)
+        return bibtex
 
     def query_bibitnow(self, url: str) -> str:
         """
         Tries to load the BibTeX of the paper behind the URL using the BibItNow! Firefox plugin
-        (https://github.com/Langenscheiss/bibitnow)
+        (https://github.com/Langenscheiss/bibitnow). Reuses the page if another strategy of the current query already
+        loaded it.
         :param url: URL to get the BibTeX for.
         :return: A string containing the BibTeX for paper in the given URL.
         """
-        if self.__browser is None:
-            raise ValueError("BibQuery has not been initialized or was already closed.")
+        self.__get_browser()
 
-        url_parsed = urlparse(url)
-        domain = url_parsed.netloc.lower()
-        *rest, top = domain.split(".")
-        rest_joined = ".".join(rest)
-        if rest_joined.startswith("www."):
-            rest_joined = rest_joined[4:]
-        path = url_parsed.path[1:]
-        for adjuster in self.__url_specific_adjusters:
-            if re.match(adjuster["scheme"], rest_joined):
-                prefselector = adjuster.get("prefselector")
-                if isinstance(adjuster["top"], list):
-                    for top_adjuster in adjuster["top"]:
-                        if top_adjuster["scheme"] == top:
-                            prefselector = adjuster.get("prefselector", prefselector)
-                            break
-                    else:
-                        raise ValueError(f"No valid adjuster found for toplevel {top} of domain {domain}.")
-                else:
-                    if adjuster["top"] != top:
-                        raise ValueError(f"No valid adjuster found for toplevel {top} of domain {domain}.")
-                if "path" in adjuster:
-                    if isinstance(adjuster["path"], list):
-                        for path_adjuster in adjuster["top"]:
-                            if re.match(path_adjuster["scheme"], path):
-                                prefselector = adjuster.get("prefselector", prefselector)
-                                break
-                        else:
-                            raise ValueError(f"No valid adjuster found for path {path} of url {url}.")
-                    else:
-                        if not re.match(adjuster["path"], path):
-                            raise ValueError(f"No valid adjuster found for path {path} of url {url}.")
-                break
-        else:
-            raise ValueError(f"No valid adjuster found for url {url}.")
-
-        with (self.__res_path / "prefselectors" / f"{prefselector}.js").open() as f:
-            prefselector_code = f.read()
-
-        self.__browser.get(url)
-        prefselector_code_augmented = f"""
-        {prefselector_code}
-        window.BINPrefselector = BINPrefselector;
-        """
-        self.__browser.execute_script(prefselector_code_augmented)
+        prefselector = self.__url_adjusters.find_prefselector(url)
 
-        prefselector_dict = self.__browser.execute_script(f"return BINPrefselector")
+        self.__load_page(self.__browser, url, "bibitnow", reuse=True)
+        if prefselector is not None:
+            self.__browser.execute_script(load_prefselector(self.__res_path / "prefselectors", prefselector))
+            prefselector_dict = self.__browser.execute_script("return BINPrefselector")
+        else:
+            prefselector_dict = {}
         if "getFallbackURL" in prefselector_dict:
             fallback_url = self.__browser.execute_script(
                 "return BINPrefselector['getFallbackURL'](arguments[0]);", url)
             if fallback_url is not None:
-                self.__browser.get(fallback_url)
-
-        self.__browser.switch_to.frame("bibquery-popup")
-        result_element = self.__wait_and_get(self.__browser, By.XPATH, "//textarea[@id='textToCopy']")
-
-        bibtex_result = None
-        start_time = time.time()
-        while bibtex_result is None or bibtex_result == "Loading page...":
-            bibtex_result = result_element.get_attribute("value")
-            time.sleep(0.1)
-            if time.time() - start_time > 60.0:
-                raise TimeoutError("Timed out waiting for BibTeX entry to load.")
+                self.__load_page(self.__browser, fallback_url, "bibitnow")
+
+        with self.__timed("extraction", "bibitnow"):
+            start_time = time.time()
+            popup = self.__wait_and_get(self.__browser, "//iframe[@id='bibquery-popup']", self.__bibitnow_timeout)
+            self.__browser.switch_to.frame(popup)
+            remaining_time = max(self.__bibitnow_timeout - (time.time() - start_time), 0.0)
+            bibtex_result = self.__browser.execute_async_script(
+                WAIT_FOR_VALUE_SCRIPT, "//textarea[@id='textToCopy']", ["Loading page..."],
+                int(remaining_time * 1000))
+        if bibtex_result is None:
+            raise TimeoutError("Timed out waiting for BibTeX entry to load.")
 
         if not bibtex_result.startswith("@"):
             raise ValueError(f"BibItNow returned unexpected string \"{bibtex_result}\"")
@@ -231,57 +775,106 @@ class BibQuery:
 
     def query_google_scholar(self, url: str) -> str:
         """
-        Tries to load the BibTeX of the paper behind the URL using Google Scholar.
+        Tries to load the BibTeX of the paper behind the URL using Google Scholar. Queries are rate limited by the
+        Scholar scheduler, which is shared with other instances.
         :param url: URL to get the BibTeX for.
         :return: A string containing the BibTeX for paper in the given URL.
         """
-        if self.__browser is None:
-            raise ValueError("BibQuery has not been initialized or was already closed.")
-
+        browser = self.__get_browser()
+        if not self.__scholar_scheduler.acquire(lambda: self.__abort_requested):
+            raise QueryAbortedException("Query was aborted while waiting for Google Scholar.")
+        cookie_generation = self.__apply_scholar_cookies(browser)
         try:
-            return self.__query_google_scholar(url, self.__browser)
+            result = self.__query_google_scholar(url, browser)
         except CaptchaEncounteredException:
-            logger.info("Encountered Captcha. Prompting user to solve it.")
-            browser = webdriver.Firefox(executable_path=GeckoDriverManager(
-                path=str(self.__cache_path), cache_valid_range=14).install(), log_path=os.devnull)
-            try:
-                return_value = self.__query_google_scholar(url, browser, cancel_on_captcha=False)
-
-                # This seems to be the only way of obtaining and setting cookies for www.google.com
-                browser.get("https://scholar.google.com/")
-                cookies = browser.get_cookies()
-                with self.__cookie_path.open("w") as f:
-                    json.dump(cookies, f)
-                self.__browser.get("https://scholar.google.com/")
-                self.__browser.delete_all_cookies()
-                for cookie in cookies:
-                    self.__browser.add_cookie(cookie)
-            finally:
-                browser.close()
-            return return_value
-
-    def __query_google_scholar(self, url: str, browser: WebDriver, cancel_on_captcha: bool = True) -> str:
-        browser.get("https://scholar.google.com/")
-        browser.find_element(By.NAME, "q").send_keys(url)
-        browser.find_element(By.NAME, "btnG").click()
+            cooldown = self.__scholar_scheduler.report_captcha()
+            logger.info(f"Encountered Captcha, pausing Google Scholar queries for up to {cooldown:.0f} seconds.")
+            if not self.__solve_captchas:
+                raise
+            return self.__solve_captcha(url, browser, cookie_generation)
+        self.__scholar_scheduler.report_success()
+        return result
+
+    def __solve_captcha(self, url: str, browser: "WebDriver", cookie_generation: int) -> str:
+        with self.__scholar_scheduler.captcha_lock:
+            if self.__scholar_scheduler.cookies[0] == cookie_generation:
+                return self.__prompt_captcha(url, browser)
+        # Another instance had the user solve a captcha in the meantime, so retry with its cookies. The retry waits for
+        # its turn like any other Scholar query, as all instances that waited for the captcha would otherwise hit
+        # Scholar at once, right after it throttled
+        if not self.__scholar_scheduler.acquire(lambda: self.__abort_requested):
+            raise QueryAbortedException("Query was aborted while waiting for Google Scholar.")
+        self.__apply_scholar_cookies(browser)
+        try:
+            result = self.__query_google_scholar(url, browser)
+        except CaptchaEncounteredException:
+            self.__scholar_scheduler.report_captcha()
+            raise
+        self.__scholar_scheduler.report_success()
+        return result
+
+    def __prompt_captcha(self, url: str, browser: "WebDriver") -> str:
+        logger.info("Prompting user to solve the Captcha.")
+        visible_browser = self.__create_firefox(headless=False)
+        try:
+            return_value = self.__query_google_scholar(url, visible_browser, cancel_on_captcha=False)
+
+            # This seems to be the only way of obtaining and setting cookies for www.google.com
+            visible_browser.get(f"{self.__scholar_url}/")
+            cookies = visible_browser.get_cookies()
+            with self.__cookie_path.open("w") as f:
+                json.dump(cookies, f)
+        finally:
+            visible_browser.quit()
+        # The other browsers pick up the new cookies before their next Scholar query
+        self.__scholar_scheduler.captcha_solved(cookies)
+        self.__apply_scholar_cookies(browser)
+        return return_value
+
+    def __apply_scholar_cookies(self, browser: "WebDriver") -> int:
+        generation, cookies = self.__scholar_scheduler.cookies
+        if generation == 0 and self.__cookie_path.exists():
+            with self.__cookie_path.open() as f:
+                cookies = json.load(f)
+            generation = self.__scholar_scheduler.update_cookies(cookies)
+        if not cookies or generation == self.__scholar_cookie_generation:
+            return generation
+        with self.__timed("cookie_restore", "google_scholar"):
+            if urlparse(browser.current_url).hostname != urlparse(self.__scholar_url).hostname:
+                # Cookies can only be set for the domain of the current page, of which robots.txt is the cheapest
+                self.__load_page(browser, f"{self.__scholar_url}/robots.txt", "google_scholar")
+            browser.delete_all_cookies()
+            for cookie in cookies:
+                browser.add_cookie(cookie)
+        self.__scholar_cookie_generation = generation
+        return generation
 
-        start_time = time.time()
-        citation_element = None
-        while (time.time() - start_time < 60.0 or not cancel_on_captcha) and citation_element is None:
-            citation_elements = browser.find_elements(By.XPATH, "//a[@aria-controls='gs_cit']")
-            if len(citation_elements) > 0:
-                citation_element = citation_elements[0]
-            else:
-                recaptcha_element_present = \
-                    len(browser.find_elements(By.XPATH, "//iframe[@title='reCAPTCHA']")) > 0
-                if recaptcha_element_present and cancel_on_captcha:
-                    raise CaptchaEncounteredException("Encountered Captcha when querying Google Scholar.")
-                time.sleep(0.1)
-        if citation_element is None:
+    def __query_google_scholar(self, url: str, browser: "WebDriver", cancel_on_captcha: bool = True) -> str:
+        from selenium.common.exceptions import JavascriptException
+
+        self.__load_page(browser, f"{self.__scholar_url}/scholar?{urlencode({'q': url})}", "google_scholar")
+
+        citation_xpath = "//a[@aria-controls='gs_cit']"
+        if cancel_on_captcha:
+            result = self.__wait_for_any(
+                browser, [citation_xpath, "//iframe[@title='reCAPTCHA']"], self.__scholar_timeout)
+            if result is not None and result[0] == 1:
+                raise CaptchaEncounteredException("Encountered Captcha when querying Google Scholar.")
+        else:
+            # Give the user as much time as they need to solve the captcha
+            result = None
+            while result is None:
+                try:
+                    result = self.__wait_for_any(browser, [citation_xpath], self.__scholar_timeout)
+                except JavascriptException:
+                    # Solving the captcha navigates away, which aborts the waiting script
+                    pass
+        if result is None:
             raise TimeoutError("Timed out waiting for the citation link to appear on Google Scholar.")
-        citation_element.click()
+        result[1].click()
 
-        link = self.__wait_and_get(browser, By.XPATH, "//a[contains(text(), 'BibTeX')]").get_attribute("href")
+        link = self.__wait_and_get(
+            browser, "//a[contains(text(), 'BibTeX')]", self.__scholar_timeout).get_attribute("href")
 
-        browser.get(link)
-        return browser.find_element(By.XPATH, "/html/body/pre").text
+        self.__load_page(browser, link, "google_scholar")
+        return browser.find_element("xpath", "/html/body/pre").text
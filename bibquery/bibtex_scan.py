@@ -0,0 +1,148 @@
+import html
+import itertools
+import re
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+BIBTEX_TYPES = [
+    "article", "book", "booklet", "conference", "inbook", "incollection", "inproceedings", "manual",
+    "mastersthesis", "misc", "phdthesis", "proceedings", "techreport", "unpublished"]
+
+ENTRY_START_PATTERN = re.compile(rf"@(?:{'|'.join(BIBTEX_TYPES)})\s*{{", re.IGNORECASE)
+# Also matches the entry types of biblatex (e.g. @online), but not the special @comment, @preamble and @string
+ANY_ENTRY_START_PATTERN = re.compile(r"@(?!(?:comment|preamble|string)\b)[a-z]+\s*{", re.IGNORECASE)
+BRACE_PATTERN = re.compile(r"[{}]")
+WORD_PATTERN = re.compile(r"\w+")
+FIELD_TOKEN_PATTERN = re.compile(r"[{}\",]")
+FIELD_NAME_PATTERN = re.compile(r"\s*([^\s=,{}\"]+)\s*=\s*")
+
+
+def _match_braces(text: str) -> Dict[int, int]:
+    # Matches all braces in a single pass, so that each entry's end is found in constant time afterwards
+    matches = {}
+    stack = []
+    for m in BRACE_PATTERN.finditer(text):
+        if m.group() == "{":
+            stack.append(m.start())
+        elif len(stack) > 0:
+            matches[stack.pop()] = m.start()
+    return matches
+
+
+def find_bibtex_entries(text: str, any_type: bool = False) -> Iterator[str]:
+    """
+    Finds all BibTeX entries with balanced braces in the given text in time linear in its length.
+    :param text: Text to search, e.g., the HTML of a web page.
+    :param any_type: Whether to find entries of any type, e.g., in a .bib file, instead of the standard BibTeX types.
+    :return: An iterator over the entries in order of appearance. Entries do not overlap.
+    """
+    start_pattern = ANY_ENTRY_START_PATTERN if any_type else ENTRY_START_PATTERN
+    brace_matches = None
+    position = 0
+    while True:
+        start_match = start_pattern.search(text, position)
+        if start_match is None:
+            return
+        if brace_matches is None:
+            brace_matches = _match_braces(text)
+        end = brace_matches.get(start_match.end() - 1)
+        if end is None:
+            position = start_match.end()
+        else:
+            yield text[start_match.start():end + 1]
+            position = end + 1
+
+
+def _find_field_value(entry: str, value_start: int) -> Optional[str]:
+    if value_start >= len(entry):
+        return None
+    opening = entry[value_start]
+    depth = 0
+    if opening in "{\"":
+        for i in range(value_start + 1, len(entry)):
+            c = entry[i]
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                if depth == 0:
+                    return entry[value_start + 1:i] if opening == "{" else None
+                depth -= 1
+            elif c == "\"" and opening == "\"" and depth == 0 and entry[i - 1] != "\\":
+                return entry[value_start + 1:i]
+        return None
+    end = re.search(r"[,}]", entry[value_start:])
+    return entry[value_start:value_start + end.start()] if end is not None else None
+
+
+def _top_level_commas(entry: str, start: int) -> Iterator[int]:
+    # Yields the positions after the commas on the top level of the entry, i.e., outside of braced and quoted values
+    depth = 1
+    quoted = False
+    for m in FIELD_TOKEN_PATTERN.finditer(entry, start):
+        c = m.group()
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return
+        elif depth == 1:
+            if c == "\"" and entry[m.start() - 1] != "\\":
+                quoted = not quoted
+            elif not quoted:
+                yield m.end()
+
+
+def extract_field(entry: str, name: str) -> Optional[str]:
+    """
+    Extracts the value of a field from a BibTeX entry without parsing the whole entry, in a single pass over it.
+    :param entry: The BibTeX entry.
+    :param name: Name of the field, e.g., "title".
+    :return: The field value with outer braces or quotes removed, or None if the entry has no such field.
+    """
+    opening = entry.find("{")
+    if opening < 0:
+        return None
+    name = name.lower()
+    # Fields start right after the opening brace (in entries without a key) or after a comma on the top level of the
+    # entry, not inside the values of other fields
+    for field_start in itertools.chain([opening + 1], _top_level_commas(entry, opening + 1)):
+        field = FIELD_NAME_PATTERN.match(entry, field_start)
+        if field is not None and field.group(1).lower() == name:
+            return _find_field_value(entry, field.end())
+    return None
+
+
+def normalize_title(title: str) -> str:
+    title = html.unescape(title).replace("{", "").replace("}", "")
+    return " ".join(WORD_PATTERN.findall(title.lower()))
+
+
+def _words(text: str) -> Set[str]:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def best_matching_entry(text: str, page_title: str) -> Optional[str]:
+    """
+    Finds the BibTeX entry in the given text whose title best matches the page title. Candidates are scored by the
+    fraction of their title words that also occur in the page title.
+    :param text: Text to search, e.g., the HTML of a web page.
+    :param page_title: Title of the page.
+    :return: The best matching entry or None if no entry matches sufficiently.
+    """
+    page_words = _words(html.unescape(page_title))
+    if len(page_words) == 0:
+        return None
+    best: Optional[Tuple[float, str]] = None
+    for entry in find_bibtex_entries(text):
+        title = extract_field(entry, "title")
+        if title is None:
+            continue
+        title_words = _words(normalize_title(title))
+        if len(title_words) == 0:
+            continue
+        shared = len(title_words & page_words)
+        score = shared / len(title_words)
+        if score > 0.5 or shared / len(page_words) > 0.5 and score > 0.15:
+            if best is None or score > best[0]:
+                best = (score, entry)
+    return None if best is None else best[1]
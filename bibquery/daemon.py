@@ -0,0 +1,160 @@
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .bibquery import DEFAULT_CACHE_PATH, BibQueryException
+from .pool import BibQueryPool
+
+logger = logging.getLogger("BibQuery")
+
+DEFAULT_SOCKET_PATH = DEFAULT_CACHE_PATH / "daemon.sock"
+
+
+class BibQueryDaemon:
+    """
+    Keeps a pool of initialized BibQuery instances running and serves queries over a local Unix socket, so that
+    short-lived clients do not have to pay the browser startup cost on every invocation.
+
+    The protocol consists of one JSON object per line in each direction. Requests have the form
+    {"url": ..., "use_cache": ..., "refresh": ...} and are answered with either {"bibtex": ...} or
+    {"error": ..., "type": ...}. A request of the form {"command": "shutdown"} stops the daemon.
+    """
+
+    def __init__(self, socket_path: Union[str, Path] = DEFAULT_SOCKET_PATH, max_workers: int = 1,
+                 idle_timeout: Optional[float] = 3600.0, use_result_cache: bool = True, **bibquery_kwargs):
+        """
+        :param socket_path: Path of the Unix socket to listen on.
+        :param max_workers: Number of browsers to keep running.
+        :param idle_timeout: Time in seconds without requests after which the daemon shuts down. None disables the
+                             idle shutdown.
+        :param use_result_cache: Whether to cache query results at all.
+        :param bibquery_kwargs: Further keyword arguments passed on to each BibQuery instance, e.g., timeouts.
+        """
+        self.__socket_path = Path(socket_path)
+        self.__idle_timeout = idle_timeout
+        self.__pool = BibQueryPool(max_workers=max_workers, use_result_cache=use_result_cache, warm_start=True,
+                                   **bibquery_kwargs)
+        self.__server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self.__activity_lock = threading.Lock()
+        self.__active_requests = 0
+        self.__last_activity = time.monotonic()
+
+    def serve_forever(self):
+        """
+        Serves requests until the daemon is shut down via a shutdown request or the idle timeout.
+        """
+        if is_daemon_running(self.__socket_path):
+            raise RuntimeError(f"A daemon is already listening on {self.__socket_path}.")
+        # The socket file is stale if nobody is listening on it
+        self.__socket_path.unlink(missing_ok=True)
+        self.__socket_path.parent.mkdir(exist_ok=True, parents=True)
+
+        handle_request = self.__handle_request
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = handle_request(line)
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+                    self.wfile.flush()
+
+        with self.__pool:
+            self.__server = socketserver.ThreadingUnixStreamServer(str(self.__socket_path), Handler)
+            self.__server.daemon_threads = True
+            self.__socket_path.chmod(0o600)
+            if self.__idle_timeout is not None:
+                threading.Thread(target=self.__watch_idle, name="BibQueryDaemonIdleWatcher", daemon=True).start()
+            logger.info(f"Serving on {self.__socket_path} with {self.__pool.max_workers} browser(s).")
+            try:
+                self.__server.serve_forever()
+            finally:
+                self.__server.server_close()
+                self.__socket_path.unlink(missing_ok=True)
+                logger.info("Daemon stopped.")
+
+    def shutdown(self):
+        if self.__server is not None:
+            # shutdown blocks until serve_forever returns, so it must not run on the serving thread
+            threading.Thread(target=self.__server.shutdown, daemon=True).start()
+
+    def __handle_request(self, line: bytes) -> Dict[str, Any]:
+        with self.__activity_lock:
+            self.__active_requests += 1
+        try:
+            request = json.loads(line)
+            if request.get("command") == "shutdown":
+                self.shutdown()
+                return {"status": "shutting down"}
+            future = self.__pool.submit(
+                request["url"], use_cache=request.get("use_cache", True), refresh=request.get("refresh", False))
+            result = future.result()
+            if result.error is not None:
+                raise result.error
+            return {"bibtex": result.bibtex}
+        except Exception as e:
+            return {"error": str(e), "type": type(e).__name__}
+        finally:
+            with self.__activity_lock:
+                self.__active_requests -= 1
+                self.__last_activity = time.monotonic()
+
+    def __watch_idle(self):
+        while True:
+            time.sleep(min(self.__idle_timeout, 10.0))
+            with self.__activity_lock:
+                idle = self.__active_requests == 0 and \
+                       time.monotonic() - self.__last_activity > self.__idle_timeout
+            if idle:
+                logger.info(f"No requests for {self.__idle_timeout:.0f}s, shutting down.")
+                self.shutdown()
+                return
+
+
+def _send_request(request: Dict[str, Any], socket_path: Union[str, Path], timeout: Optional[float]) \
+        -> Dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path))
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(request).encode() + b"\n")
+            f.flush()
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Daemon closed the connection without responding.")
+    return json.loads(line)
+
+
+def is_daemon_running(socket_path: Union[str, Path] = DEFAULT_SOCKET_PATH) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+
+
+def query_daemon(url: str, use_cache: bool = True, refresh: bool = False,
+                 socket_path: Union[str, Path] = DEFAULT_SOCKET_PATH, timeout: Optional[float] = None) -> str:
+    """
+    Queries the BibTeX of the given URL via a running daemon.
+    :param url: URL to get the BibTeX for.
+    :param use_cache: Whether to read from and write to the result cache.
+    :param refresh: Ignore cached results but store the new result in the cache.
+    :param socket_path: Path of the Unix socket the daemon listens on.
+    :param timeout: Timeout in seconds for the whole request. None waits indefinitely.
+    :return: A string containing the BibTeX for paper in the given URL.
+    :raises OSError: If no daemon is reachable at the given socket path.
+    """
+    response = _send_request({"url": url, "use_cache": use_cache, "refresh": refresh}, socket_path, timeout)
+    if "error" in response:
+        raise BibQueryException(f"Daemon failed to load BibTeX for URL \"{url}\": {response['error']}")
+    return response["bibtex"]
+
+
+def stop_daemon(socket_path: Union[str, Path] = DEFAULT_SOCKET_PATH):
+    _send_request({"command": "shutdown"}, socket_path, timeout=10.0)
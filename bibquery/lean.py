@@ -0,0 +1,102 @@
+import json
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+# Third-party analytics, advertising and consent domains that publisher pages commonly load
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com", "doubleclick.net",
+    "googlesyndication.com", "googleadservices.com", "adservice.google.com", "connect.facebook.net",
+    "scorecardresearch.com", "hotjar.com", "nr-data.net", "js-agent.newrelic.com", "quantserve.com", "adnxs.com",
+    "criteo.com", "criteo.net", "taboola.com", "outbrain.com", "crazyegg.com", "chartbeat.com", "chartbeat.net",
+    "optimizely.com", "mouseflow.com", "cdn.segment.com", "mixpanel.com", "bat.bing.com", "clarity.ms",
+    "snap.licdn.com", "static.ads-twitter.com", "addthis.com", "sharethis.com", "pendo.io", "fullstory.com",
+    "omtrdc.net", "demdex.net", "everesttech.net", "cdn.cookielaw.org", "trendmd.com")
+
+# Preferences of lean mode that affect which content of a page is loaded. They are relaxed on allowed domains.
+CONTENT_PREFERENCES: Dict[str, Any] = {
+    # Do not load any images
+    "permissions.default.image": 2,
+    # Use local fonts instead of downloading web fonts
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    # Neither play nor preload audio and video
+    "media.autoplay.default": 5,
+    "media.preload.default": 0,
+    "media.preload.auto": 0,
+}
+
+# Proxy that refuses all connections, used for blocked domains
+BLACKHOLE_PROXY = "127.0.0.1:9"
+
+# Sets the given preferences in the chrome context of the browser, with null resetting a preference to its default
+SET_PREFERENCES_SCRIPT = """
+const [preferences] = arguments;
+for (const [name, value] of Object.entries(preferences)) {
+    if (value === null) {
+        Services.prefs.clearUserPref(name);
+    } else if (typeof value === "boolean") {
+        Services.prefs.setBoolPref(name, value);
+    } else if (typeof value === "number") {
+        Services.prefs.setIntPref(name, value);
+    } else {
+        Services.prefs.setStringPref(name, value);
+    }
+}
+"""
+
+
+def _matches_domain(host: str, domains: Tuple[str, ...]) -> bool:
+    return any(host == d or host.endswith(f".{d}") for d in domains)
+
+
+class LeanMode(NamedTuple):
+    """
+    Configuration of lean browsing, which skips loading content that the query strategies do not need.
+    """
+    # Whether to skip images, web fonts and audio/video
+    block_content: bool = True
+    # Domains (including their subdomains) to which no requests are made at all
+    blocked_domains: Tuple[str, ...] = DEFAULT_BLOCKED_DOMAINS
+    # Domains (including their subdomains) on which images, fonts and media are loaded regardless, e.g., because
+    # their metadata depends on them
+    allowed_domains: Tuple[str, ...] = ()
+    # Whether page loads finish once the document is parsed instead of waiting for all resources
+    eager: bool = True
+
+    def allows(self, url: str) -> bool:
+        """
+        :param url: URL of a page.
+        :return: Whether all content of the page is loaded despite lean mode.
+        """
+        return _matches_domain((urlparse(url).hostname or "").lower(), self.allowed_domains)
+
+    def preferences(self, proxy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Creates the Firefox preferences implementing this configuration.
+        :param proxy: HTTP proxy ("host:port") through which all requests to domains that are not blocked are made.
+        :return: A dictionary mapping preference names to values.
+        """
+        preferences = dict(CONTENT_PREFERENCES) if self.block_content else {}
+        if len(self.blocked_domains) > 0:
+            preferences["network.proxy.type"] = 2
+            preferences["network.proxy.autoconfig_url"] = \
+                "data:application/x-ns-proxy-autoconfig," + quote(self.proxy_autoconfig(proxy))
+        return preferences
+
+    def proxy_autoconfig(self, proxy: Optional[str] = None) -> str:
+        """
+        Creates a proxy auto-config (PAC) script sending requests to blocked domains to a proxy refusing all
+        connections.
+        :param proxy: HTTP proxy ("host:port") for all other requests. If None, they are made directly.
+        :return: The PAC script.
+        """
+        default = "DIRECT" if proxy is None else f"PROXY {proxy}"
+        return f"""function FindProxyForURL(url, host) {{
+    var blocked = {json.dumps(list(self.blocked_domains))};
+    for (var i = 0; i < blocked.length; i++) {{
+        if (host === blocked[i] || dnsDomainIs(host, "." + blocked[i])) {{
+            return "PROXY {BLACKHOLE_PROXY}";
+        }}
+    }}
+    return "{default}";
+}}"""
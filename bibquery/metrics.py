@@ -0,0 +1,133 @@
+import json
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .strategy_stats import domain_of
+
+# Stages reported by BibQuery, in the order they usually occur
+STAGES = [
+    "query", "cache_lookup", "resolver", "strategy", "fallback", "driver_resolution", "profile_setup",
+    "browser_launch", "addon_install", "cookie_restore", "http_request", "page_load", "extraction"]
+
+
+class StageTiming(NamedTuple):
+    # One of STAGES
+    stage: str
+    # Time in seconds spent in the stage
+    duration: float
+    # URL being queried when the stage occurred, None for stages outside of queries
+    url: Optional[str] = None
+    # Strategy or resolver the stage belongs to. For fallbacks, the failed and the next strategy joined by "->".
+    strategy: Optional[str] = None
+    success: bool = True
+
+
+TimingHook = Callable[[StageTiming], None]
+
+
+class StageRecord(NamedTuple):
+    count: int
+    total_time: float
+    max_time: float
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.count if self.count > 0 else 0.0
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsCollector:
+    """
+    Timing hook aggregating the stage timings of one or more BibQuery instances per stage, strategy, domain and
+    outcome. Can be passed to multiple instances, e.g., all workers of a pool, at once.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__records: Dict[Tuple[str, str, str, bool], StageRecord] = {}
+
+    def __call__(self, timing: StageTiming):
+        key = (timing.stage, timing.strategy or "", domain_of(timing.url) if timing.url else "", timing.success)
+        with self.__lock:
+            record = self.__records.get(key, StageRecord(0, 0.0, 0.0))
+            self.__records[key] = StageRecord(
+                record.count + 1, record.total_time + timing.duration, max(record.max_time, timing.duration))
+
+    @property
+    def records(self) -> Dict[Tuple[str, str, str, bool], StageRecord]:
+        """
+        A dictionary mapping tuples of stage, strategy, domain and success to the aggregated timings. Strategy and
+        domain are empty strings where not applicable.
+        """
+        with self.__lock:
+            return dict(self.__records)
+
+    def aggregate(self, by_domain: bool = False) -> Dict[Tuple[str, ...], StageRecord]:
+        """
+        Aggregates the timings over all outcomes and, unless by_domain is set, over all domains.
+        :param by_domain: Whether to keep the domains apart.
+        :return: A dictionary mapping tuples of stage, strategy and, if by_domain is set, domain to the timings.
+        """
+        result = {}
+        for (stage, strategy, domain, _), record in self.records.items():
+            key = (stage, strategy, domain) if by_domain else (stage, strategy)
+            total = result.get(key, StageRecord(0, 0.0, 0.0))
+            result[key] = StageRecord(total.count + record.count, total.total_time + record.total_time,
+                                      max(total.max_time, record.max_time))
+        return result
+
+    def format_summary(self, top_domains: int = 10) -> str:
+        """
+        Formats a human-readable summary of where the time went.
+        :param top_domains: Number of domains with the longest total query time to list.
+        :return: The summary as multi-line string.
+        """
+        lines = [f"{'stage':<18} {'strategy':<34} {'count':>6} {'total [s]':>10} {'mean [s]':>9} {'max [s]':>8}"]
+        stages = self.aggregate()
+        for stage, strategy in sorted(stages, key=lambda k: (STAGES.index(k[0]) if k[0] in STAGES else len(STAGES),
+                                                             -stages[k].total_time)):
+            r = stages[(stage, strategy)]
+            lines.append(f"{stage:<18} {strategy:<34} {r.count:>6} {r.total_time:>10.2f} {r.mean_time:>9.2f} "
+                         f"{r.max_time:>8.2f}")
+        domains: Dict[str, StageRecord] = {}
+        for (stage, _, domain, _), record in self.records.items():
+            if stage == "query" and domain:
+                total = domains.get(domain, StageRecord(0, 0.0, 0.0))
+                domains[domain] = StageRecord(total.count + record.count, total.total_time + record.total_time,
+                                              max(total.max_time, record.max_time))
+        if len(domains) > 0:
+            lines.append("")
+            lines.append(f"{'domain':<53} {'count':>6} {'total [s]':>10} {'mean [s]':>9} {'max [s]':>8}")
+            for domain in sorted(domains, key=lambda d: -domains[d].total_time)[:top_domains]:
+                r = domains[domain]
+                lines.append(f"{domain:<53} {r.count:>6} {r.total_time:>10.2f} {r.mean_time:>9.2f} "
+                             f"{r.max_time:>8.2f}")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        :return: The timings in the Prometheus text exposition format.
+        """
+        lines = ["# HELP bibquery_stage_duration_seconds Time spent in each stage of the BibTeX queries.",
+                 "# TYPE bibquery_stage_duration_seconds summary"]
+        for (stage, strategy, domain, success), record in sorted(self.records.items()):
+            labels = ",".join(f"{name}=\"{_escape_label(value)}\"" for name, value in [
+                ("stage", stage), ("strategy", strategy), ("domain", domain),
+                ("outcome", "success" if success else "failure")])
+            lines.append(f"bibquery_stage_duration_seconds_sum{{{labels}}} {record.total_time:.6f}")
+            lines.append(f"bibquery_stage_duration_seconds_count{{{labels}}} {record.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        """
+        :return: The timings as JSON list of records.
+        """
+        records: List[dict] = []
+        for (stage, strategy, domain, success), record in sorted(self.records.items()):
+            records.append({"stage": stage, "strategy": strategy or None, "domain": domain or None,
+                            "success": success, "count": record.count, "total_time": round(record.total_time, 6),
+                            "max_time": round(record.max_time, 6)})
+        return json.dumps(records, indent=2)
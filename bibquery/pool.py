@@ -0,0 +1,220 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .bibquery import DEFAULT_CACHE_PATH, BibQuery, BibQueryException, QueryAbortedException, QueryResult, \
+    ScholarDeferredException
+from .result_cache import ResultCache
+from .strategy_stats import StrategyStats
+
+logger = logging.getLogger("BibQuery")
+
+
+class BibQueryPool:
+    """
+    Runs queries on a pool of BibQuery instances, each owned by its own worker thread. Workers pull URLs from a shared
+    queue, so that work is distributed evenly, and a worker whose browser crashes restarts it for the next URL without
+    affecting the other workers.
+    """
+
+    def __init__(self, max_workers: int = 4, result_cache: Optional[ResultCache] = None,
+                 use_result_cache: bool = True, warm_start: bool = False, **bibquery_kwargs):
+        """
+        :param max_workers: Number of BibQuery instances (and thus browsers) to run in parallel.
+        :param result_cache: Cache shared by all workers. If None and use_result_cache is set, a cache in the default
+                             cache directory is opened by start and closed by close, as are the strategy statistics
+                             unless passed in via bibquery_kwargs.
+        :param use_result_cache: Whether to cache query results at all.
+        :param warm_start: Start all browsers right away instead of on the first query that needs them.
+        :param bibquery_kwargs: Further keyword arguments passed on to each BibQuery instance, e.g., timeouts.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.__max_workers = max_workers
+        self.__use_result_cache = use_result_cache
+        self.__result_cache = result_cache
+        self.__warm_start = warm_start
+        self.__bibquery_kwargs = bibquery_kwargs
+        self.__jobs: "queue.Queue[Optional[Tuple[str, Dict[str, Any], Future]]]" = queue.Queue()
+        self.__workers: List[threading.Thread] = []
+        self.__running_lock = threading.Lock()
+        self.__running: Dict[Future, BibQuery] = {}
+        # Whether the cache and statistics were created by start, in which case close closes them again
+        self.__owns_result_cache = False
+        self.__owns_strategy_stats = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    def start(self):
+        if self.__use_result_cache and self.__result_cache is None:
+            # Create the cache and statistics once here so that all workers share a single connection
+            self.__result_cache = ResultCache(DEFAULT_CACHE_PATH / "results.sqlite")
+            self.__owns_result_cache = True
+        if self.__bibquery_kwargs.get("use_strategy_stats", True) and \
+                self.__bibquery_kwargs.get("strategy_stats") is None:
+            self.__bibquery_kwargs["strategy_stats"] = StrategyStats(DEFAULT_CACHE_PATH / "strategy_stats.sqlite")
+            self.__owns_strategy_stats = True
+        for i in range(self.__max_workers):
+            worker = threading.Thread(target=self.__run_worker, name=f"BibQueryWorker-{i}", daemon=True)
+            worker.start()
+            self.__workers.append(worker)
+
+    def close(self):
+        for _ in self.__workers:
+            self.__jobs.put(None)
+        for worker in self.__workers:
+            worker.join()
+        self.__workers.clear()
+        if self.__owns_result_cache:
+            self.__result_cache.close()
+            self.__result_cache = None
+            self.__owns_result_cache = False
+        if self.__owns_strategy_stats:
+            self.__bibquery_kwargs.pop("strategy_stats").close()
+            self.__owns_strategy_stats = False
+
+    def submit(self, url: str, **query_kwargs) -> Future:
+        """
+        Schedules a query for the given URL.
+        :param url: URL to get the BibTeX for.
+        :param query_kwargs: Keyword arguments passed on to BibQuery.query_detailed.
+        :return: A future resolving to the QueryResult. Errors during the query are reported in the result rather than
+                 raised by the future.
+        """
+        if len(self.__workers) == 0:
+            raise ValueError("BibQueryPool has not been started or was already closed.")
+        future = Future()
+        self.__jobs.put((url, query_kwargs, future))
+        return future
+
+    def abort(self, future: Future) -> bool:
+        """
+        Cancels a scheduled query or, if it is already running, aborts it by killing the browser of its worker.
+        :param future: Future returned by submit.
+        :return: True if the query was cancelled or aborted, False if it had already completed.
+        """
+        if future.cancel():
+            return True
+        with self.__running_lock:
+            bq = self.__running.get(future)
+            if bq is not None:
+                bq.abort()
+        return bq is not None
+
+    def imap(self, urls: Iterable[str], ordered: bool = True, defer_scholar: bool = False,
+             **query_kwargs) -> Iterator[QueryResult]:
+        """
+        Queries all given URLs on the pool. Only a bounded number of URLs is scheduled at any time, so that arbitrarily
+        long iterables can be processed.
+        :param urls: URLs to get the BibTeX for.
+        :param ordered: If True, results are yielded in the order of the input URLs, otherwise as soon as they are
+                        completed.
+        :param defer_scholar: Query Google Scholar only after all other URLs, so that URLs which can be resolved
+                              otherwise are not held up by its rate limit. Results of the deferred URLs are yielded
+                              last.
+        :param query_kwargs: Keyword arguments passed on to BibQuery.query_detailed.
+        :return: An iterator over the query results.
+        """
+        if not defer_scholar:
+            yield from self.__imap(urls, ordered, **query_kwargs)
+            return
+        deferred = []
+        for result in self.__imap(urls, ordered, defer_scholar=True, **query_kwargs):
+            if isinstance(result.error, ScholarDeferredException):
+                deferred.append(result.url)
+            else:
+                yield result
+        if len(deferred) > 0:
+            logger.info(f"Querying Google Scholar for {len(deferred)} deferred URLs.")
+            yield from self.__imap(deferred, ordered, strategies=["google_scholar"], **query_kwargs)
+
+    def __imap(self, urls: Iterable[str], ordered: bool, **query_kwargs) -> Iterator[QueryResult]:
+        url_iter = iter(urls)
+        pending: "deque[Tuple[str, Future]]" = deque()
+        window = 2 * self.__max_workers
+
+        def fill():
+            for url in url_iter:
+                pending.append((url, self.submit(url, **query_kwargs)))
+                if len(pending) >= window:
+                    break
+
+        fill()
+        while len(pending) > 0:
+            if ordered:
+                yield pending.popleft()[1].result()
+            else:
+                done, _ = wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+                for item in [p for p in pending if p[1] in done]:
+                    pending.remove(item)
+                    yield item[1].result()
+            fill()
+
+    def __run_worker(self):
+        bq: Optional[BibQuery] = None
+        try:
+            if self.__warm_start:
+                try:
+                    bq = self.__create_bibquery()
+                    bq.start_browser()
+                except Exception:
+                    logger.warning(f"{threading.current_thread().name} failed to start its browser.", exc_info=True)
+                    bq = self.__close_quietly(bq)
+            while True:
+                job = self.__jobs.get()
+                if job is None:
+                    break
+                url, query_kwargs, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                start_time = time.time()
+                try:
+                    if bq is None:
+                        bq = self.__create_bibquery()
+                    with self.__running_lock:
+                        self.__running[future] = bq
+                    try:
+                        result = bq.query_detailed(url, **query_kwargs)
+                    finally:
+                        with self.__running_lock:
+                            del self.__running[future]
+                    future.set_result(result)
+                except (BibQueryException, QueryAbortedException) as e:
+                    future.set_result(QueryResult(url, duration=time.time() - start_time, error=e))
+                except Exception as e:
+                    # Anything other than a BibQueryException, e.g., a BrowserUnavailableException after the browser
+                    # died repeatedly, means that the browser is in an unknown state
+                    logger.warning(f"{threading.current_thread().name} failed on {url} ({type(e).__name__}: {e}), "
+                                   f"restarting its browser.")
+                    future.set_result(QueryResult(url, duration=time.time() - start_time, error=e))
+                    bq = self.__close_quietly(bq)
+        finally:
+            self.__close_quietly(bq)
+
+    def __create_bibquery(self) -> BibQuery:
+        bq = BibQuery(
+            result_cache=self.__result_cache, use_result_cache=self.__use_result_cache, **self.__bibquery_kwargs)
+        bq.initialize()
+        return bq
+
+    @staticmethod
+    def __close_quietly(bq: Optional[BibQuery]) -> None:
+        if bq is not None:
+            try:
+                bq.close()
+            except Exception:
+                logger.debug("Failed to close BibQuery instance.", exc_info=True)
+        return None
@@ -0,0 +1,190 @@
+import re
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Union
+from urllib.parse import unquote, urlparse
+
+from .bibtex_scan import find_bibtex_entries
+
+if TYPE_CHECKING:
+    import requests
+
+ARXIV_BASE_URL = "https://arxiv.org"
+DOI_BASE_URL = "https://doi.org"
+
+# New-style (e.g. 1706.03762v5) and old-style (e.g. hep-th/9901001) arXiv identifiers with an optional version
+ARXIV_ID_PATTERN = r"(?P<id>\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?"
+ARXIV_URL_PATTERN = re.compile(
+    rf"^https?://(?:www\.|export\.)?arxiv\.org/(?:abs|pdf|bibtex)/{ARXIV_ID_PATTERN}(?:\.pdf)?/?(?:[?#].*)?$",
+    re.IGNORECASE)
+DOI_PATTERN = re.compile(r"10\.\d{4,9}/\S+")
+
+
+class Resolver(ABC):
+    """
+    Fast path that recognizes an identifier in a URL and fetches the BibTeX for it directly over HTTP, without
+    loading the page in a browser.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Name of the resolver, which is recorded as the strategy that produced a result.
+        """
+        self.__name = name
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @abstractmethod
+    def extract_identifier(self, url: str) -> Optional[str]:
+        """
+        Extracts the identifier this resolver handles from the URL.
+        :param url: URL to be queried.
+        :return: The identifier or None if the URL is not handled by this resolver.
+        """
+
+    @abstractmethod
+    def fetch(self, identifier: str, session: "requests.Session", timeout: float) -> str:
+        """
+        Fetches the BibTeX for the identifier.
+        :param identifier: Identifier as returned by extract_identifier.
+        :param session: Session to make the requests with, so that connections are pooled.
+        :param timeout: Timeout in seconds for each request.
+        :return: A string containing the BibTeX.
+        """
+
+
+class HttpResolver(Resolver):
+    """
+    Resolver that extracts the identifier from the URL using a regular expression and fetches the BibTeX from an
+    endpoint containing that identifier. Suitable for most repositories offering a BibTeX export.
+    """
+
+    def __init__(self, name: str, url_pattern: Union[str, Pattern], endpoint: str,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        :param name: Name of the resolver.
+        :param url_pattern: Regular expression searched in the URL. The identifier is taken from its group "id" or, if
+                            there is no such group, the whole match.
+        :param endpoint: URL of the BibTeX export, containing "{id}" as placeholder for the identifier.
+        :param headers: Additional HTTP headers sent to the endpoint, e.g., for content negotiation.
+        """
+        super().__init__(name)
+        self.__url_pattern = re.compile(url_pattern) if isinstance(url_pattern, str) else url_pattern
+        self.__endpoint = endpoint
+        self.__headers = headers or {}
+
+    def extract_identifier(self, url: str) -> Optional[str]:
+        match = self.__url_pattern.search(url)
+        if match is None:
+            return None
+        return match.group("id") if "id" in self.__url_pattern.groupindex else match.group()
+
+    def fetch(self, identifier: str, session: "requests.Session", timeout: float) -> str:
+        response = session.get(self.__endpoint.format(id=identifier), headers=self.__headers, timeout=timeout)
+        response.raise_for_status()
+        bibtex = next(find_bibtex_entries(response.text), None)
+        if bibtex is None:
+            raise ValueError(f"Response of {self.name} for \"{identifier}\" does not contain a BibTeX entry.")
+        return bibtex
+
+
+class ArxivResolver(HttpResolver):
+    """
+    Resolves arXiv abstract and PDF links using arXiv's BibTeX export.
+    """
+
+    def __init__(self, base_url: str = ARXIV_BASE_URL):
+        """
+        :param base_url: Base URL of the BibTeX export, e.g., of a local stand-in server for testing.
+        """
+        super().__init__("arxiv", ARXIV_URL_PATTERN, f"{base_url.rstrip('/')}/bibtex/{{id}}")
+
+
+class DoiResolver(HttpResolver):
+    """
+    Resolves doi.org links and publisher links of the form .../doi/<DOI> using DOI content negotiation.
+    """
+
+    def __init__(self, base_url: str = DOI_BASE_URL):
+        """
+        :param base_url: Base URL of the DOI resolver, e.g., of a local stand-in server for testing.
+        """
+        super().__init__("doi", DOI_PATTERN, f"{base_url.rstrip('/')}/{{id}}",
+                         headers={"Accept": "application/x-bibtex; charset=utf-8"})
+
+    def extract_identifier(self, url: str) -> Optional[str]:
+        url_parsed = urlparse(url)
+        host = (url_parsed.hostname or "").lower()
+        path = unquote(url_parsed.path)
+        if host == "doi.org" or host.endswith(".doi.org"):
+            doi = path[1:]
+        else:
+            # Publishers such as ACM or Wiley serve their pages under /doi/[abs/|full/|pdf/]<DOI>
+            match = re.search(r"/doi/(?:(?:abs|full|pdf|epdf|book)/)?(10\..*)$", path)
+            if match is None:
+                return None
+            doi = match.group(1)
+        return doi if DOI_PATTERN.fullmatch(doi) is not None else None
+
+
+class ResolverRegistry:
+    """
+    Ordered collection of resolvers consulted before the browser-based query strategies.
+    """
+
+    def __init__(self, resolvers: Optional[Iterable[Resolver]] = None):
+        """
+        :param resolvers: Initial resolvers, in the order they are consulted.
+        """
+        self.__resolvers: List[Resolver] = []
+        for resolver in resolvers or []:
+            self.register(resolver)
+
+    def __iter__(self) -> Iterator[Resolver]:
+        return iter(list(self.__resolvers))
+
+    def __len__(self) -> int:
+        return len(self.__resolvers)
+
+    def register(self, resolver: Resolver, first: bool = False):
+        """
+        Registers a resolver, replacing any resolver of the same name.
+        :param resolver: The resolver.
+        :param first: Whether to consult the resolver before the already registered ones.
+        """
+        self.unregister(resolver.name)
+        if first:
+            self.__resolvers.insert(0, resolver)
+        else:
+            self.__resolvers.append(resolver)
+
+    def unregister(self, name: str):
+        """
+        Removes the resolver of the given name if it is registered.
+        :param name: Name of the resolver.
+        """
+        self.__resolvers = [r for r in self.__resolvers if r.name != name]
+
+    def matching(self, url: str) -> List[Tuple[Resolver, str]]:
+        """
+        Finds the resolvers handling the given URL.
+        :param url: URL to be queried.
+        :return: A list of tuples of resolver and the identifier it extracted from the URL, in registration order.
+        """
+        result = []
+        for resolver in self:
+            identifier = resolver.extract_identifier(url)
+            if identifier is not None:
+                result.append((resolver, identifier))
+        return result
+
+
+def default_resolvers(arxiv_base_url: str = ARXIV_BASE_URL, doi_base_url: str = DOI_BASE_URL) -> ResolverRegistry:
+    """
+    Creates a registry containing the built-in resolvers.
+    :param arxiv_base_url: Base URL of arXiv's BibTeX export.
+    :param doi_base_url: Base URL of the DOI resolver.
+    :return: A registry with the arXiv and DOI resolvers.
+    """
+    return ResolverRegistry([ArxivResolver(arxiv_base_url), DoiResolver(doi_base_url)])
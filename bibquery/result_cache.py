@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+EVICTION_INTERVAL = 64
+
+
+class CacheEntry(NamedTuple):
+    bibtex: Optional[str]
+    strategy: Optional[str]
+    error: Optional[str]
+    timestamp: float
+
+    @property
+    def is_failure(self) -> bool:
+        return self.bibtex is None
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL for use as a cache key: lowercases scheme and host, drops default ports and fragments and sorts
+    the query parameters.
+    :param url: URL to normalize.
+    :return: The normalized URL.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = (parsed.hostname or "").lower()
+    if parsed.port is not None and DEFAULT_PORTS.get(scheme) != parsed.port:
+        netloc = f"{netloc}:{parsed.port}"
+    if parsed.username is not None:
+        netloc = f"{parsed.username}@{netloc}"
+    path = parsed.path or "/"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, path, parsed.params, query, ""))
+
+
+class ResultCache:
+    """
+    Persistent SQLite cache for BibTeX query results. Successful results and failures are stored with separate
+    time-to-live values and the cache is bounded in size by evicting the least recently used entries.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: float = 30 * 24 * 3600.0, negative_ttl: float = 24 * 3600.0,
+                 max_entries: Optional[int] = 100000):
+        """
+        :param path: Path of the SQLite database file.
+        :param ttl: Time in seconds after which successful results expire.
+        :param negative_ttl: Time in seconds after which failed queries expire.
+        :param max_entries: Maximum number of entries to keep. If exceeded, the least recently used entries are
+                            evicted. None disables the limit.
+        """
+        self.__path = Path(path)
+        self.__ttl = ttl
+        self.__negative_ttl = negative_ttl
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__stores_since_eviction = 0
+        self.__path.parent.mkdir(exist_ok=True, parents=True)
+        self.__connection = sqlite3.connect(str(self.__path), check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "url TEXT PRIMARY KEY, bibtex TEXT, strategy TEXT, error TEXT, timestamp REAL NOT NULL, "
+            "last_access REAL NOT NULL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Looks up the cached result for the given URL.
+        :param url: URL to look up.
+        :return: The cached entry or None if there is no entry or it has expired.
+        """
+        key = normalize_url(url)
+        now = time.time()
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT bibtex, strategy, error, timestamp FROM results WHERE url = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(*row)
+            ttl = self.__negative_ttl if entry.is_failure else self.__ttl
+            if now - entry.timestamp > ttl:
+                self.__connection.execute("DELETE FROM results WHERE url = ?", (key,))
+                return None
+            self.__connection.execute("UPDATE results SET last_access = ? WHERE url = ?", (now, key))
+        return entry
+
+    def put(self, url: str, bibtex: str, strategy: Optional[str] = None):
+        """
+        Stores a successful result.
+        :param url: URL the BibTeX was obtained for.
+        :param bibtex: The BibTeX entry.
+        :param strategy: Name of the strategy that produced the entry.
+        """
+        self.__store(url, bibtex, strategy, None)
+
+    def put_failure(self, url: str, error: str):
+        """
+        Stores a failed query, so that it is not repeated until the negative TTL expires.
+        :param url: URL the query failed for.
+        :param error: Error message of the failure.
+        """
+        self.__store(url, None, None, error)
+
+    def invalidate(self, url: str):
+        with self.__lock:
+            self.__connection.execute("DELETE FROM results WHERE url = ?", (normalize_url(url),))
+
+    def clear(self):
+        with self.__lock:
+            self.__connection.execute("DELETE FROM results")
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __len__(self):
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __store(self, url: str, bibtex: Optional[str], strategy: Optional[str], error: Optional[str]):
+        now = time.time()
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO results (url, bibtex, strategy, error, timestamp, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (normalize_url(url), bibtex, strategy, error, now, now))
+            self.__stores_since_eviction += 1
+            # Eviction requires scanning the access index, so it is amortized over multiple stores
+            if self.__max_entries is not None and \
+                    self.__stores_since_eviction >= min(EVICTION_INTERVAL, self.__max_entries):
+                self.__stores_since_eviction = 0
+                self.__connection.execute(
+                    "DELETE FROM results WHERE url IN ("
+                    "SELECT url FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.__max_entries,))
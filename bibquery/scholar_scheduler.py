@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Maximum time in seconds between checks whether a waiting query was aborted
+ABORT_POLL_INTERVAL = 1.0
+
+
+class ScholarScheduler:
+    """
+    Rate limiter for Google Scholar shared by all BibQuery instances of a process. Queries are admitted by a token
+    bucket, so that short bursts are served right away while the sustained rate stays below Scholar's throttling
+    threshold. Once a captcha is encountered, all Scholar queries pause for a cool-down that doubles with each
+    consecutive captcha. The scheduler also hands the cookies obtained by solving a captcha to all browsers.
+    """
+
+    def __init__(self, rate: float = 0.2, burst: int = 3, cooldown: float = 300.0, max_cooldown: float = 3600.0):
+        """
+        :param rate: Sustained number of Scholar queries per second.
+        :param burst: Number of Scholar queries that may be made at once after a period without queries.
+        :param cooldown: Time in seconds to pause all Scholar queries after the first captcha.
+        :param max_cooldown: Upper bound of the cool-down after consecutive captchas.
+        """
+        self.__rate = rate
+        self.__burst = burst
+        self.__cooldown = cooldown
+        self.__max_cooldown = max_cooldown
+        self.__tokens = float(burst)
+        self.__last_refill = time.monotonic()
+        self.__cooldown_until = 0.0
+        self.__consecutive_captchas = 0
+        self.__condition = threading.Condition()
+        self.__captcha_lock = threading.Lock()
+        self.__cookies: Optional[List[dict]] = None
+        self.__cookie_generation = 0
+
+    def __refill(self, now: float):
+        # During a cool-down, the last refill lies in the future, so that no tokens accumulate
+        if now > self.__last_refill:
+            self.__tokens = min(float(self.__burst), self.__tokens + (now - self.__last_refill) * self.__rate)
+            self.__last_refill = now
+
+    def acquire(self, should_abort: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Blocks until a Scholar query may be made.
+        :param should_abort: Called regularly while waiting. Waiting stops as soon as it returns True.
+        :return: True if the query may be made, False if waiting was aborted.
+        """
+        with self.__condition:
+            while True:
+                if should_abort is not None and should_abort():
+                    return False
+                now = time.monotonic()
+                self.__refill(now)
+                if now < self.__cooldown_until:
+                    wait_time = self.__cooldown_until - now
+                elif self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return True
+                else:
+                    wait_time = (1 - self.__tokens) / self.__rate
+                self.__condition.wait(min(wait_time, ABORT_POLL_INTERVAL))
+
+    @property
+    def cooldown_remaining(self) -> float:
+        with self.__condition:
+            return max(0.0, self.__cooldown_until - time.monotonic())
+
+    def report_success(self):
+        """
+        Reports a Scholar query that was not stopped by a captcha, which resets the cool-down backoff.
+        """
+        with self.__condition:
+            self.__consecutive_captchas = 0
+
+    def report_captcha(self) -> float:
+        """
+        Reports a captcha, pausing all Scholar queries.
+        :return: The duration of the cool-down in seconds.
+        """
+        with self.__condition:
+            cooldown = min(self.__cooldown * 2 ** self.__consecutive_captchas, self.__max_cooldown)
+            self.__consecutive_captchas += 1
+            now = time.monotonic()
+            self.__cooldown_until = max(self.__cooldown_until, now + cooldown)
+            self.__tokens = 0.0
+            self.__last_refill = self.__cooldown_until
+            return cooldown
+
+    @property
+    def captcha_lock(self) -> threading.Lock:
+        """
+        Lock held while a user solves a captcha, so that only a single captcha prompt is open at a time.
+        """
+        return self.__captcha_lock
+
+    def captcha_solved(self, cookies: List[dict]):
+        """
+        Ends the cool-down after a user solved a captcha and shares the resulting cookies.
+        :param cookies: Cookies of the browser the captcha was solved in.
+        """
+        with self.__condition:
+            self.__consecutive_captchas = 0
+            self.__cooldown_until = 0.0
+            self.__last_refill = time.monotonic()
+            self.__cookies = cookies
+            self.__cookie_generation += 1
+            self.__condition.notify_all()
+
+    @property
+    def cookies(self) -> Tuple[int, Optional[List[dict]]]:
+        """
+        The current Scholar cookies together with their generation, which increases whenever they are replaced.
+        Generation 0 means that no cookies are known yet.
+        """
+        with self.__condition:
+            return self.__cookie_generation, self.__cookies
+
+    def update_cookies(self, cookies: List[dict]) -> int:
+        """
+        Replaces the Scholar cookies, e.g., with those loaded from disk.
+        :param cookies: The new cookies.
+        :return: The generation of the new cookies.
+        """
+        with self.__condition:
+            self.__cookies = cookies
+            self.__cookie_generation += 1
+            return self.__cookie_generation
+
+
+_default_scheduler: Optional[ScholarScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scholar_scheduler() -> ScholarScheduler:
+    """
+    :return: The scheduler shared by all BibQuery instances that are not given their own.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ScholarScheduler()
+        return _default_scheduler
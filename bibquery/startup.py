@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("BibQuery")
+
+# Age after which a cached geckodriver is checked for updates
+DRIVER_MAX_AGE = timedelta(days=1)
+
+# Age after which the profile template is rebuilt, e.g., to pick up changes of a Firefox update
+PROFILE_TEMPLATE_MAX_AGE = timedelta(days=7)
+
+PROFILE_TEMPLATE_METADATA = "bibquery_template.json"
+
+# Files of the template that are not copied: locks and ports of the browser that built it, caches that are only
+# valid for a single session, and the template's own metadata
+PROFILE_TEMPLATE_EXCLUDED = (
+    "lock", ".parentlock", "parent.lock", "MarionetteActivePort", "cache2", "crashes", "minidumps",
+    "saved-telemetry-pings", PROFILE_TEMPLATE_METADATA)
+
+_driver_path_lock = threading.Lock()
+_profile_template_lock = threading.Lock()
+
+
+def firefox_environment(tmp_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    Creates the environment of geckodriver and Firefox, leaving the environment of this process untouched.
+    :param tmp_dir: Directory for the temporary files of the browser. If None, the default is kept.
+    :return: The environment of this process without the SNAP-related variables, which mess with selenium.
+    """
+    env = {key: value for key, value in os.environ.items() if not key.lower().startswith("snap")}
+    if tmp_dir is not None:
+        env["TMPDIR"] = tmp_dir
+    return env
+
+
+def _cached_drivers(cache_path: Path) -> List[Tuple[datetime, str]]:
+    drivers_json_path = cache_path / ".wdm" / "drivers.json"
+    try:
+        with drivers_json_path.open() as f:
+            drivers_dict = json.load(f)
+    except (OSError, ValueError):
+        return []
+    drivers = []
+    for name, properties in drivers_dict.items():
+        try:
+            timestamp = datetime.strptime(properties["timestamp"], "%d/%m/%Y")
+            binary_path = properties["binary_path"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if "geckodriver" in name and os.path.isfile(binary_path) and os.access(binary_path, os.X_OK):
+            drivers.append((timestamp, binary_path))
+    return sorted(drivers, reverse=True)
+
+
+@lru_cache(maxsize=None)
+def _resolve_driver_path(cache_path: Path) -> str:
+    # Workaround for the GitHub rate limit issue (https://github.com/SergeyPirogov/webdriver_manager/issues/442)
+    drivers = _cached_drivers(cache_path)
+    if len(drivers) > 0 and datetime.today() - drivers[0][0] < DRIVER_MAX_AGE:
+        return drivers[0][1]
+
+    from webdriver_manager.core.driver_cache import DriverCacheManager
+    from webdriver_manager.firefox import GeckoDriverManager
+
+    # Disable annoying webdriver manager outputs
+    os.environ.setdefault("WDM_PROGRESS_BAR", "0")
+    try:
+        return GeckoDriverManager(cache_manager=DriverCacheManager(cache_path)).install()
+    except Exception:
+        if len(drivers) == 0:
+            raise
+        logger.warning(f"Failed to check for a geckodriver update, using the cached {drivers[0][1]}.", exc_info=True)
+        return drivers[0][1]
+
+
+def resolve_driver_path(cache_path: Path) -> str:
+    """
+    Finds geckodriver in the cache, downloading it if it is missing or outdated. The result is kept for the lifetime
+    of the process, so that restarted browsers and the workers of a pool only look it up once.
+    :param cache_path: Cache directory of BibQuery.
+    :return: The path of the geckodriver binary.
+    """
+    with _driver_path_lock:
+        return _resolve_driver_path(cache_path)
+
+
+class ProfileTemplate:
+    """
+    Firefox profile that is created once in the cache directory and copied for each new browser, so that browsers
+    start from an initialized profile instead of creating one from scratch. If Firefox accepts the BibItNow addon
+    permanently, it is installed in the template as well.
+    """
+
+    def __init__(self, path: Path, addon_path: Path, max_age: timedelta = PROFILE_TEMPLATE_MAX_AGE):
+        """
+        :param path: Directory of the template.
+        :param addon_path: Path of the BibItNow addon. The template is rebuilt whenever the addon changes.
+        :param max_age: Age after which the template is rebuilt.
+        """
+        self.__path = path
+        self.__addon_path = addon_path
+        self.__max_age = max_age
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def __addon_signature(self) -> List[int]:
+        stat = self.__addon_path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def __load_metadata(self) -> Optional[dict]:
+        try:
+            with (self.__path / PROFILE_TEMPLATE_METADATA).open() as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - metadata.get("created", 0) >= self.__max_age.total_seconds():
+            return None
+        if metadata.get("addon") != self.__addon_signature():
+            return None
+        return metadata
+
+    def ensure(self, build: Callable[[Path], bool]) -> bool:
+        """
+        Builds the template unless an up-to-date one exists.
+        :param build: Called with an empty directory, which it has to start and quit Firefox with as profile.
+                      Returns whether it installed the addon permanently.
+        :return: Whether the addon is installed in the template.
+        """
+        with _profile_template_lock:
+            metadata = self.__load_metadata()
+            if metadata is not None:
+                return metadata["addon_installed"]
+
+            logger.info(f"Building Firefox profile template in {self.__path}.")
+            self.__path.parent.mkdir(exist_ok=True, parents=True)
+            # The template is built next to its final location and moved there once complete, so that other processes
+            # never copy a partial template
+            build_path = Path(mkdtemp(prefix=f"{self.__path.name}_", dir=self.__path.parent))
+            old_path = build_path.with_name(f"{build_path.name}_old")
+            try:
+                metadata = {"created": time.time(), "addon": self.__addon_signature(),
+                            "addon_installed": build(build_path)}
+                with (build_path / PROFILE_TEMPLATE_METADATA).open("w") as f:
+                    json.dump(metadata, f)
+                if self.__path.exists():
+                    self.__path.rename(old_path)
+                build_path.rename(self.__path)
+            finally:
+                shutil.rmtree(build_path, ignore_errors=True)
+                shutil.rmtree(old_path, ignore_errors=True)
+            return metadata["addon_installed"]
+
+    def copy_to(self, destination: Path):
+        """
+        Copies the template to a new profile directory.
+        :param destination: Directory of the new profile, which must not exist yet.
+        """
+        shutil.copytree(self.__path, destination, ignore=shutil.ignore_patterns(*PROFILE_TEMPLATE_EXCLUDED))
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Union
+from urllib.parse import urlparse
+
+
+class StrategyRecord(NamedTuple):
+    successes: int
+    failures: int
+    total_time: float
+
+    @property
+    def attempts(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.attempts if self.attempts > 0 else 0.0
+
+
+def domain_of(url: str) -> str:
+    domain = (urlparse(url).hostname or "").lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+class StrategyStats:
+    """
+    Persistent per-domain statistics on the outcome and duration of each query strategy. Used to try the strategies
+    most likely to succeed quickly first and, optionally, to skip strategies that never work for a domain.
+
+    Strategies with enough samples are ordered by their estimated success probability per second, which minimizes the
+    expected time until the first success when strategies are tried one after another.
+    """
+
+    def __init__(self, path: Union[str, Path], min_samples: int = 3, skip_failing: bool = False,
+                 skip_after: int = 10):
+        """
+        :param path: Path of the SQLite database file.
+        :param min_samples: Number of attempts of a strategy on a domain before its position in the order is changed.
+        :param skip_failing: Whether to skip strategies that never succeeded on a domain.
+        :param skip_after: Number of failed attempts without a single success after which a strategy is skipped.
+        """
+        self.__path = Path(path)
+        self.__min_samples = min_samples
+        self.__skip_failing = skip_failing
+        self.__skip_after = skip_after
+        self.__lock = threading.Lock()
+        self.__path.parent.mkdir(exist_ok=True, parents=True)
+        self.__connection = sqlite3.connect(str(self.__path), check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS stats ("
+            "domain TEXT NOT NULL, strategy TEXT NOT NULL, successes INTEGER NOT NULL, failures INTEGER NOT NULL, "
+            "total_time REAL NOT NULL, PRIMARY KEY (domain, strategy))")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def record(self, url: str, strategy: str, success: bool, duration: float):
+        """
+        Records the outcome of a strategy on the domain of the given URL.
+        :param url: URL the strategy was applied to.
+        :param strategy: Name of the strategy.
+        :param success: Whether the strategy produced a BibTeX entry.
+        :param duration: Time in seconds the strategy took.
+        """
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT INTO stats (domain, strategy, successes, failures, total_time) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (domain, strategy) DO UPDATE SET successes = successes + excluded.successes, "
+                "failures = failures + excluded.failures, total_time = total_time + excluded.total_time",
+                (domain_of(url), strategy, int(success), int(not success), duration))
+
+    def get(self, domain: Optional[str] = None) -> Dict[str, Dict[str, StrategyRecord]]:
+        """
+        Returns the recorded statistics.
+        :param domain: Domain to return the statistics for. If None, the statistics of all domains are returned.
+        :return: A dictionary mapping domains to dictionaries mapping strategy names to their records.
+        """
+        query = "SELECT domain, strategy, successes, failures, total_time FROM stats"
+        with self.__lock:
+            if domain is None:
+                rows = self.__connection.execute(f"{query} ORDER BY domain, strategy").fetchall()
+            else:
+                rows = self.__connection.execute(f"{query} WHERE domain = ?", (domain,)).fetchall()
+        result = {}
+        for row_domain, strategy, *record in rows:
+            result.setdefault(row_domain, {})[strategy] = StrategyRecord(*record)
+        return result
+
+    def reset(self, domain: Optional[str] = None):
+        """
+        Deletes the recorded statistics.
+        :param domain: Domain to delete the statistics for. If None, all statistics are deleted.
+        """
+        with self.__lock:
+            if domain is None:
+                self.__connection.execute("DELETE FROM stats")
+            else:
+                self.__connection.execute("DELETE FROM stats WHERE domain = ?", (domain,))
+
+    def order(self, url: str, strategies: List[str]) -> List[str]:
+        """
+        Orders the given strategies for the domain of the given URL.
+        :param url: URL to be queried.
+        :param strategies: Names of the strategies in their default order.
+        :return: The strategies in the order they should be tried, without those that should be skipped.
+        """
+        domain = domain_of(url)
+        records = self.get(domain).get(domain, {})
+        sampled = [s for s in strategies if s in records and records[s].attempts >= self.__min_samples]
+
+        def rate(strategy: str) -> float:
+            record = records[strategy]
+            # Laplace smoothing keeps strategies with few failures from dropping out entirely
+            probability = (record.successes + 1) / (record.attempts + 2)
+            return probability / max(record.mean_time, 1e-3)
+
+        # Strategies with enough samples are reordered among their own positions, the others keep their position
+        reordered = iter(sorted(sampled, key=rate, reverse=True))
+        ordered = [next(reordered) if s in sampled else s for s in strategies]
+        if self.__skip_failing:
+            remaining = [s for s in ordered if s not in records or records[s].successes > 0 or
+                         records[s].failures < self.__skip_after]
+            if len(remaining) > 0:
+                ordered = remaining
+        return ordered
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
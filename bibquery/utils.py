@@ -1,24 +1,70 @@
 import logging
+import time
 import traceback
-from typing import Iterable
+from typing import Iterable, Iterator, Optional
 
-from .bibquery import BibQuery, BibQueryException
+from .bibquery import BibQuery, QueryResult
+from .metrics import MetricsCollector
+from .pool import BibQueryPool
 
 logger = logging.getLogger("BibQuery")
 
 
-def query(url: str):
-    with BibQuery() as bq:
-        return bq.query(url)
+def query(url: str, use_cache: bool = True, refresh: bool = False, **bibquery_kwargs):
+    with BibQuery(use_result_cache=use_cache, **bibquery_kwargs) as bq:
+        return bq.query(url, refresh=refresh)
 
 
-def query_batch(urls: Iterable[str]):
+def iter_query_batch(urls: Iterable[str], use_cache: bool = True, refresh: bool = False, max_workers: int = 1,
+                     ordered: bool = True, defer_scholar: bool = False, metrics: Optional[MetricsCollector] = None,
+                     **bibquery_kwargs) -> Iterator[QueryResult]:
+    """
+    Queries the BibTeX of multiple URLs on a pool of browsers, yielding each result as soon as it is available. The
+    URLs are consumed lazily, so that arbitrarily many URLs can be processed with constant memory.
+    :param urls: URLs to get the BibTeX for.
+    :param use_cache: Whether to read from and write to the result cache.
+    :param refresh: Ignore cached results but store the new results in the cache.
+    :param max_workers: Number of browsers to run in parallel.
+    :param ordered: If True, the results are ordered like the input URLs, otherwise in the order of completion.
+    :param defer_scholar: Query Google Scholar for URLs that need it only after all other URLs.
+    :param metrics: Collector to record the per-stage timings of all queries in.
+    :param bibquery_kwargs: Further keyword arguments passed on to each BibQuery instance, e.g., timeouts.
+    :return: An iterator over the query results. Failed queries are yielded with their error set.
+    """
+    if metrics is not None:
+        bibquery_kwargs["timing_hooks"] = [*bibquery_kwargs.get("timing_hooks", []), metrics]
+    with BibQueryPool(max_workers=max_workers, use_result_cache=use_cache, **bibquery_kwargs) as pool:
+        yield from pool.imap(urls, ordered=ordered, defer_scholar=defer_scholar, refresh=refresh)
+
+
+def query_batch(urls: Iterable[str], use_cache: bool = True, refresh: bool = False, max_workers: int = 1,
+                ordered: bool = True, defer_scholar: bool = False, metrics: Optional[MetricsCollector] = None,
+                **bibquery_kwargs):
+    """
+    Queries the BibTeX of multiple URLs on a pool of browsers and logs a summary of where the time went.
+    :param urls: URLs to get the BibTeX for.
+    :param use_cache: Whether to read from and write to the result cache.
+    :param refresh: Ignore cached results but store the new results in the cache.
+    :param max_workers: Number of browsers to run in parallel.
+    :param ordered: If True, the results are ordered like the input URLs, otherwise in the order of completion.
+    :param defer_scholar: Query Google Scholar for URLs that need it only after all other URLs.
+    :param metrics: Collector to record the per-stage timings of all queries in. If None, a new one is used for the
+                    summary.
+    :param bibquery_kwargs: Further keyword arguments passed on to each BibQuery instance, e.g., timeouts.
+    :return: A dictionary mapping each URL that could be resolved to its BibTeX.
+    """
+    metrics = metrics if metrics is not None else MetricsCollector()
+    start_time = time.time()
     results = {}
-    with BibQuery() as bq:
-        for url in urls:
-            try:
-                results[url] = bq.query(url)
-            except BibQueryException:
-                logger.error(f"Encountered error when trying to obtain BibTeX entry of {url}:\n")
-                traceback.print_exc()
+    failures = 0
+    for result in iter_query_batch(urls, use_cache=use_cache, refresh=refresh, max_workers=max_workers,
+                                   ordered=ordered, defer_scholar=defer_scholar, metrics=metrics, **bibquery_kwargs):
+        if result.error is not None:
+            logger.error(f"Encountered error when trying to obtain BibTeX entry of {result.url}:\n")
+            traceback.print_exception(type(result.error), result.error, result.error.__traceback__)
+            failures += 1
+        else:
+            results[result.url] = result.bibtex
+    logger.info(f"Queried {len(results) + failures} URLs ({failures} failed) in {time.time() - start_time:.2f} "
+                f"seconds:\n{metrics.format_summary()}")
     return results
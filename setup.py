@@ -134,8 +134,7 @@ setup(name="bibquery",
       install_requires=[
           "selenium == 4.27.1",
           "webdriver-manager == 4.0.2",
-          "regex",
-          "bibtexparser"
+          "requests"
       ],
       long_description=long_description,
       long_description_content_type='text/markdown',
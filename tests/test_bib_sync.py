@@ -0,0 +1,87 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from bibquery import BibIndex, QueryResult, canonicalize_url, load_bib_index, sync_bib, sync_index_path
+
+ENTRY = "@inproceedings{smith2021,\n  title = {Learning Fast Things},\n  url = {https://example.com/smith2021}\n}"
+
+
+class CanonicalizeUrlTest(unittest.TestCase):
+    def test_publisher_pages_with_doi_map_to_doi_org(self):
+        doi_org = "https://doi.org/10.1007/s10994-021-05946-3"
+        for url in ["https://link.springer.com/article/10.1007/s10994-021-05946-3",
+                    "https://link.springer.com/content/pdf/10.1007/s10994-021-05946-3.pdf",
+                    "https://link.springer.com/article/10.1007/s10994-021-05946-3/fulltext.html",
+                    "https://doi.org/10.1007/S10994-021-05946-3"]:
+            self.assertEqual(canonicalize_url(url), doi_org, url)
+        self.assertEqual(canonicalize_url("https://www.frontiersin.org/articles/10.3389/fpsyg.2020.01234/full"),
+                         "https://doi.org/10.3389/fpsyg.2020.01234")
+
+    def test_preprint_versions_map_to_doi(self):
+        doi_org = "https://doi.org/10.1101/2020.01.01.123456"
+        for url in ["https://www.biorxiv.org/content/10.1101/2020.01.01.123456v1",
+                    "https://www.biorxiv.org/content/10.1101/2020.01.01.123456v2.full",
+                    "https://www.biorxiv.org/content/10.1101/2020.01.01.123456v2.full.pdf",
+                    "https://www.medrxiv.org/content/10.1101/2020.01.01.123456v3.full-text",
+                    doi_org]:
+            self.assertEqual(canonicalize_url(url), doi_org, url)
+        self.assertEqual(canonicalize_url("https://www.biorxiv.org/content/10.1101/123456v2"),
+                         "https://doi.org/10.1101/123456")
+        # Journals sharing the prefix keep their DOIs
+        self.assertEqual(canonicalize_url("https://genome.cshlp.org/content/10.1101/gr.123456.111"),
+                         "https://doi.org/10.1101/gr.123456.111")
+        index = BibIndex(["@article{k, title={A Preprint Title}, doi={10.1101/2020.01.01.123456}}"])
+        self.assertTrue(index.contains_url("https://www.biorxiv.org/content/10.1101/2020.01.01.123456v2.full.pdf"))
+
+    def test_only_doi_query_parameters(self):
+        self.assertEqual(canonicalize_url("https://journals.plos.org/plosone/article?id=10.1371/journal.pone.0230416"),
+                         "https://doi.org/10.1371/journal.pone.0230416")
+        self.assertEqual(canonicalize_url("https://example.com/article?doi=10.1000/abc"), "https://doi.org/10.1000/abc")
+        for url in ["https://example.com/search?ref=10.1000/abc", "https://example.com/article?id=10.1000/abc"]:
+            self.assertFalse(canonicalize_url(url).startswith("https://doi.org/"), url)
+
+
+class SyncIndexTest(unittest.TestCase):
+    def sync(self, path, urls, bibtex):
+        queried = []
+
+        def iter_query_batch(urls, **kwargs):
+            for url in urls:
+                queried.append(url)
+                yield QueryResult(url, bibtex=bibtex)
+
+        with mock.patch("bibquery.bib_sync.iter_query_batch", iter_query_batch):
+            summary = sync_bib(path, urls)
+        return summary, queried
+
+    def test_queried_urls_are_remembered(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "library.bib"
+            # The entry's url field differs from both queried URLs, the second turns out to be a duplicate
+            urls = ["https://example.org/paper?id=1", "https://mirror.example.net/paper/1"]
+            summary, queried = self.sync(path, urls, ENTRY)
+            self.assertEqual((summary.added, summary.duplicates), (1, 1))
+            self.assertEqual(queried, urls)
+
+            summary, queried = self.sync(path, urls, ENTRY)
+            self.assertEqual((summary.present, summary.added), (2, 0))
+            self.assertEqual(queried, [])
+
+            # Once the entry is removed from the file, its URLs are queried again
+            path.write_text("")
+            self.assertFalse(load_bib_index(path).contains_url(urls[0]))
+            self.assertTrue(sync_index_path(path).exists())
+
+    def test_sync_without_queries_creates_no_index(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "library.bib"
+            path.write_text(ENTRY + "\n")
+            summary, _ = self.sync(path, ["https://example.com/smith2021/"], ENTRY)
+            self.assertEqual(summary.present, 1)
+            self.assertFalse(sync_index_path(path).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from bibquery import BibQuery, BrowserUnavailableException, CaptchaEncounteredException, QueryAbortedException, \
+    ResolverRegistry, ResultCache, ScholarScheduler, ScholarThrottledException
+
+
+class BrowserStartupFailureTest(unittest.TestCase):
+    def test_startup_failure_is_not_cached(self):
+        url = "https://example.com/paper"
+        with TemporaryDirectory() as tmp_dir:
+            cache = ResultCache(Path(tmp_dir) / "results.sqlite")
+            start_browser_failure = FileNotFoundError("geckodriver")
+            with mock.patch.object(BibQuery, "start_browser", side_effect=start_browser_failure) as start_browser:
+                with BibQuery(result_cache=cache, use_strategy_stats=False, resolvers=ResolverRegistry()) as bq:
+                    with self.assertRaises(BrowserUnavailableException):
+                        bq.query_detailed(url, strategies=["regex_search", "bibitnow"])
+            # The second browser strategy is skipped instead of trying to start the browser again
+            self.assertEqual(start_browser.call_count, 1)
+            self.assertIsNone(cache.get(url))
+            cache.close()
+
+
+class ScholarCaptchaTest(unittest.TestCase):
+    def test_captcha_is_not_cached(self):
+        url = "https://example.com/paper"
+        with TemporaryDirectory() as tmp_dir:
+            cache = ResultCache(Path(tmp_dir) / "results.sqlite")
+            captcha = CaptchaEncounteredException("captcha")
+            with mock.patch.object(BibQuery, "query_google_scholar", side_effect=captcha):
+                with BibQuery(result_cache=cache, use_strategy_stats=False, resolvers=ResolverRegistry(),
+                              scholar_scheduler=ScholarScheduler(), solve_captchas=False) as bq:
+                    with self.assertRaises(ScholarThrottledException):
+                        bq.query_detailed(url, strategies=["google_scholar"])
+            self.assertIsNone(cache.get(url))
+            cache.close()
+
+class SolvedElsewhereScheduler(ScholarScheduler):
+    """
+    Scheduler on which another instance has the user solve each captcha right after it is reported.
+    """
+
+    def report_captcha(self) -> float:
+        cooldown = super().report_captcha()
+        self.captcha_solved([])
+        return cooldown
+
+
+class CaptchaSolvedElsewhereTest(unittest.TestCase):
+    def query_google_scholar(self, scheduler, abort_after=None):
+        results = [CaptchaEncounteredException("captcha"), "@misc{a}"]
+        self.queries = []
+
+        def query(url, browser):
+            self.queries.append(url)
+            result = results[len(self.queries) - 1]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with mock.patch.object(BibQuery, "_BibQuery__get_browser"), \
+                mock.patch.object(BibQuery, "_BibQuery__apply_scholar_cookies",
+                                  side_effect=lambda browser: scheduler.cookies[0]), \
+                mock.patch.object(BibQuery, "_BibQuery__query_google_scholar", side_effect=query):
+            with BibQuery(use_result_cache=False, use_strategy_stats=False, resolvers=ResolverRegistry(),
+                          scholar_scheduler=scheduler) as bq:
+                if abort_after is not None:
+                    threading.Timer(abort_after, bq.abort).start()
+                return bq.query_google_scholar("https://example.com/paper")
+
+    def test_retry_waits_for_token(self):
+        scheduler = SolvedElsewhereScheduler(rate=20.0, burst=1)
+        with mock.patch.object(scheduler, "acquire", wraps=scheduler.acquire) as acquire:
+            self.assertEqual(self.query_google_scholar(scheduler), "@misc{a}")
+        self.assertEqual(acquire.call_count, 2)
+        self.assertEqual(len(self.queries), 2)
+
+    def test_retry_can_be_aborted(self):
+        # At this rate, the retry would wait for its token for a long time
+        scheduler = SolvedElsewhereScheduler(rate=1e-6, burst=1)
+        with self.assertRaises(QueryAbortedException):
+            self.query_google_scholar(scheduler, abort_after=0.1)
+        self.assertEqual(len(self.queries), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import time
+import unittest
+
+from bibquery.bibtex_scan import best_matching_entry, extract_field, find_bibtex_entries
+
+
+class FindBibtexEntriesTest(unittest.TestCase):
+    def test_finds_balanced_entries_in_order(self):
+        text = "<pre>@article{a,\n  title={{Deep} Learning}\n}</pre> text <pre>@MISC {b, note={x}}</pre>"
+        self.assertEqual(list(find_bibtex_entries(text)),
+                         ["@article{a,\n  title={{Deep} Learning}\n}", "@MISC {b, note={x}}"])
+
+    def test_skips_unclosed_entries(self):
+        text = "@article{broken, title={x} @book{ok, title={y}}"
+        self.assertEqual(list(find_bibtex_entries(text)), ["@book{ok, title={y}}"])
+
+    def test_entry_types(self):
+        text = "@online{a, url={u}} @comment{c} @string{s = {v}} @article{b}"
+        self.assertEqual(list(find_bibtex_entries(text)), ["@article{b}"])
+        self.assertEqual(list(find_bibtex_entries(text, any_type=True)), ["@online{a, url={u}}", "@article{b}"])
+
+
+class ExtractFieldTest(unittest.TestCase):
+    def test_value_forms(self):
+        entry = '@misc{k, Title = {A {Nested} Title}, year = 2020, note = "Say \\"hi\\", {x}", doi={10.1/x}}'
+        self.assertEqual(extract_field(entry, "title"), "A {Nested} Title")
+        self.assertEqual(extract_field(entry, "YEAR"), "2020")
+        self.assertEqual(extract_field(entry, "note"), 'Say \\"hi\\", {x}')
+        self.assertEqual(extract_field(entry, "doi"), "10.1/x")
+        self.assertIsNone(extract_field(entry, "author"))
+
+    def test_ignores_fields_inside_values(self):
+        self.assertEqual(extract_field("@misc{k, note={title = {nested}}, title={Real}}", "title"), "Real")
+        self.assertEqual(extract_field('@misc{k, note="a, title = {quoted}", title={Real}}', "title"), "Real")
+        self.assertIsNone(extract_field("@misc{k, note={x, title={nested}}}", "title"))
+
+    def test_does_not_match_suffix_of_other_field(self):
+        self.assertEqual(extract_field("@misc{k, booktitle={Proceedings}, title={Paper}}", "title"), "Paper")
+
+    def test_linear_runtime_on_nested_fields(self):
+        # Quadratic scanning takes several seconds on this input
+        entry = "@misc{k, note={" + ", title={x}" * 64000 + "}, title={Real}}"
+        start_time = time.perf_counter()
+        self.assertEqual(extract_field(entry, "title"), "Real")
+        self.assertLess(time.perf_counter() - start_time, 1.0)
+
+
+class BestMatchingEntryTest(unittest.TestCase):
+    TEXT = "<pre>@inproceedings{a, title={A Survey of Graph Neural Networks}}</pre>" \
+           "<pre>@article{b, title={{Attention} Is All You Need}}</pre>" \
+           "<pre>@misc{c, author={No Title}}</pre>"
+
+    def test_picks_entry_matching_page_title(self):
+        entry = best_matching_entry(self.TEXT, "Attention is All you Need | Proceedings")
+        self.assertEqual(entry, "@article{b, title={{Attention} Is All You Need}}")
+
+    def test_no_sufficient_match(self):
+        self.assertIsNone(best_matching_entry(self.TEXT, "Something Completely Different"))
+        self.assertIsNone(best_matching_entry(self.TEXT, ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import json
+import runpy
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import bibquery
+from bibquery import BrowserUnavailableException, QueryResult
+
+SCRIPT_PATH = Path(__file__).parent.parent / "bin" / "bibquery"
+
+
+class BatchResumeTest(unittest.TestCase):
+    def run_batch(self, output_path, urls, failing=()):
+        queried = []
+
+        def iter_query_batch(urls, **kwargs):
+            for url in urls:
+                queried.append(url)
+                if url in failing:
+                    yield QueryResult(url, error=BrowserUnavailableException("Failed to start the browser."))
+                else:
+                    yield QueryResult(url, bibtex=f"@misc{{{url[-1]},\n}}", strategy="http_regex_search")
+
+        with mock.patch.object(bibquery, "iter_query_batch", iter_query_batch), \
+                mock.patch.object(sys, "argv", ["bibquery", *urls, "--output", str(output_path)]):
+            runpy.run_path(str(SCRIPT_PATH), run_name="__main__")
+        return queried
+
+    def test_transient_failure_is_retried(self):
+        urls = ["https://example.com/a", "https://example.com/b"]
+        with TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "results.jsonl"
+            self.assertEqual(self.run_batch(output_path, urls, failing=urls[1:]), urls)
+            # Only the failed URL is queried again, until it succeeds
+            self.assertEqual(self.run_batch(output_path, urls), urls[1:])
+            self.assertEqual(self.run_batch(output_path, urls), [])
+            records = [json.loads(line) for line in output_path.read_text().splitlines()]
+            self.assertEqual([(r["url"], r["error"] is None) for r in records],
+                             [(urls[0], True), (urls[1], False), (urls[1], True)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import sqlite3
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from selenium.common.exceptions import InvalidSessionIdException
+
+from bibquery import BibQuery, BibQueryPool, BrowserUnavailableException, ResolverRegistry, StrategyStats
+
+PAGE_TITLE = "Fast Things in Slow Worlds"
+PAGE_HTML = f"<pre>@article{{fast2024,\n  title = {{{PAGE_TITLE}}},\n  year = {{2024}}\n}}</pre>"
+
+
+class FakeElement:
+    def get_attribute(self, name):
+        return PAGE_HTML
+
+
+class FakeBrowser:
+    """
+    Stands in for Firefox, either serving a page with a BibTeX entry or behaving like a browser whose process died.
+    """
+
+    def __init__(self, alive: bool):
+        self.alive = alive
+        self.title = PAGE_TITLE
+        self.capabilities = {}
+        self.switch_to = mock.Mock()
+
+    def get(self, url):
+        if not self.alive:
+            raise InvalidSessionIdException("Tried to run command without establishing a connection")
+
+    def find_element(self, by, value):
+        return FakeElement()
+
+    def quit(self):
+        pass
+
+
+class PoolBrowserCrashTest(unittest.TestCase):
+    def run_pool(self, alive):
+        starts = []
+
+        def start_browser(bq):
+            starts.append(bq)
+            bq._BibQuery__tmp_dir = TemporaryDirectory()
+            bq._BibQuery__browser = FakeBrowser(alive(len(starts)))
+
+        urls = [f"https://example.com/{i}" for i in range(3)]
+        with mock.patch.object(BibQuery, "start_browser", start_browser):
+            with BibQueryPool(max_workers=1, use_result_cache=False, use_strategy_stats=False,
+                              resolvers=ResolverRegistry()) as pool:
+                results = list(pool.imap(urls, strategies=["regex_search"]))
+        return starts, results
+
+    def test_dead_browser_is_restarted(self):
+        # Only the first browser is dead, all queries succeed in its replacement
+        starts, results = self.run_pool(lambda n: n > 1)
+        self.assertEqual(len(starts), 2)
+        self.assertTrue(all(r.succeeded for r in results))
+
+    def test_repeatedly_dying_browser_restarts_worker(self):
+        starts, results = self.run_pool(lambda n: False)
+        self.assertTrue(all(isinstance(r.error, BrowserUnavailableException) for r in results))
+        # Each query tries two browsers, after which the worker starts over with a new BibQuery instance
+        self.assertEqual(len(starts), 6)
+        self.assertEqual(len({id(bq) for bq in starts}), 3)
+
+
+class PoolCloseTest(unittest.TestCase):
+    def test_closes_only_own_stores(self):
+        with TemporaryDirectory() as tmp_dir, mock.patch("bibquery.pool.DEFAULT_CACHE_PATH", Path(tmp_dir)):
+            shared_stats = StrategyStats(Path(tmp_dir) / "shared.sqlite")
+            pool = BibQueryPool(max_workers=1, strategy_stats=shared_stats)
+            with pool:
+                own_cache = pool._BibQueryPool__result_cache
+            with self.assertRaises(sqlite3.ProgrammingError):
+                own_cache.get("https://example.com")
+            self.assertEqual(shared_stats.get(), {})
+            # A restarted pool opens a new cache
+            with pool:
+                self.assertIsNone(pool._BibQueryPool__result_cache.get("https://example.com"))
+            shared_stats.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import sqlite3
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from bibquery import BibQuery, ResolverRegistry, ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.now = 1000.0
+        time_patch = mock.patch("bibquery.result_cache.time")
+        time_patch.start().time.side_effect = lambda: self.now
+        self.addCleanup(time_patch.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def open_cache(self, **kwargs) -> ResultCache:
+        cache = ResultCache(Path(self.tmp_dir.name) / "results.sqlite", **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_ttl_expiry(self):
+        cache = self.open_cache(ttl=100.0, negative_ttl=10.0)
+        cache.put("https://example.com/a", "@misc{a}", "bibitnow")
+        self.now += 100.0
+        self.assertEqual(cache.get("https://EXAMPLE.com/a#section").bibtex, "@misc{a}")
+        self.now += 1.0
+        self.assertIsNone(cache.get("https://example.com/a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_negative_ttl(self):
+        cache = self.open_cache(ttl=100.0, negative_ttl=10.0)
+        cache.put_failure("https://example.com/b", "BibQueryException: no entry")
+        self.now += 10.0
+        entry = cache.get("https://example.com/b")
+        self.assertTrue(entry.is_failure)
+        self.assertEqual(entry.error, "BibQueryException: no entry")
+        self.now += 1.0
+        self.assertIsNone(cache.get("https://example.com/b"))
+
+    def test_lru_eviction(self):
+        cache = self.open_cache(max_entries=3)
+        for name in "abc":
+            self.now += 1.0
+            cache.put(f"https://example.com/{name}", f"@misc{{{name}}}")
+        self.now += 1.0
+        # Accessing the oldest entry keeps it, so the next least recently used ones are evicted instead
+        self.assertIsNotNone(cache.get("https://example.com/a"))
+        for name in "de":
+            self.now += 1.0
+            cache.put(f"https://example.com/{name}", f"@misc{{{name}}}")
+        # Eviction runs every max_entries stores, so only this third store since the last eviction triggers it
+        self.now += 1.0
+        cache.put("https://example.com/e", "@misc{e}")
+        self.assertEqual(len(cache), 3)
+        self.assertEqual([name for name in "abcde" if cache.get(f"https://example.com/{name}") is not None],
+                         ["a", "d", "e"])
+
+
+class BibQueryCloseTest(unittest.TestCase):
+    def test_closes_only_own_stores(self):
+        with TemporaryDirectory() as tmp_dir, mock.patch("bibquery.bibquery.DEFAULT_CACHE_PATH", Path(tmp_dir)):
+            shared_cache = ResultCache(Path(tmp_dir) / "shared.sqlite")
+            with BibQuery(resolvers=ResolverRegistry()) as bq:
+                own_cache, own_stats = bq.result_cache, bq.strategy_stats
+            with BibQuery(result_cache=shared_cache, use_strategy_stats=False, resolvers=ResolverRegistry()):
+                pass
+            with self.assertRaises(sqlite3.ProgrammingError):
+                own_cache.get("https://example.com")
+            with self.assertRaises(sqlite3.ProgrammingError):
+                own_stats.get()
+            self.assertIsNone(shared_cache.get("https://example.com"))
+            shared_cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
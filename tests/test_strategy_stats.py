@@ -0,0 +1,64 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from bibquery import StrategyStats
+
+URL = "https://www.example.com/paper"
+STRATEGIES = ["http_regex_search", "regex_search", "bibitnow", "google_scholar"]
+
+
+class StrategyStatsOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def open_stats(self, **kwargs) -> StrategyStats:
+        stats = StrategyStats(Path(self.tmp_dir.name) / "strategy_stats.sqlite", **kwargs)
+        self.addCleanup(stats.close)
+        return stats
+
+    @staticmethod
+    def record(stats, strategy, successes, failures, duration=1.0, url=URL):
+        for success in [True] * successes + [False] * failures:
+            stats.record(url, strategy, success, duration)
+
+    def test_default_order_below_min_samples(self):
+        stats = self.open_stats(min_samples=3)
+        self.record(stats, "http_regex_search", 0, 2)
+        self.record(stats, "bibitnow", 2, 0)
+        self.assertEqual(stats.order(URL, STRATEGIES), STRATEGIES)
+
+    def test_reorders_sampled_strategies_among_their_positions(self):
+        stats = self.open_stats(min_samples=3)
+        self.record(stats, "http_regex_search", 0, 3, duration=0.5)
+        self.record(stats, "bibitnow", 3, 0, duration=1.0)
+        # regex_search has too few samples and keeps its position
+        self.record(stats, "regex_search", 1, 0)
+        self.assertEqual(stats.order(URL, STRATEGIES),
+                         ["bibitnow", "regex_search", "http_regex_search", "google_scholar"])
+        # Statistics are kept per domain, "www." ignored
+        self.assertEqual(stats.order("https://example.org/paper", STRATEGIES), STRATEGIES)
+        self.assertEqual(stats.order("https://example.com/other", STRATEGIES)[0], "bibitnow")
+
+    def test_faster_strategy_first_at_equal_success(self):
+        stats = self.open_stats(min_samples=1)
+        self.record(stats, "regex_search", 2, 2, duration=4.0)
+        self.record(stats, "http_regex_search", 2, 2, duration=0.2)
+        self.assertEqual(stats.order(URL, ["regex_search", "http_regex_search"]), ["http_regex_search", "regex_search"])
+
+    def test_skip_failing(self):
+        stats = self.open_stats(skip_failing=True, skip_after=5)
+        self.record(stats, "http_regex_search", 0, 5)
+        self.record(stats, "regex_search", 0, 4)
+        self.record(stats, "bibitnow", 2, 8)
+        self.assertEqual(stats.order(URL, STRATEGIES), ["bibitnow", "regex_search", "google_scholar"])
+        # Strategies are never all skipped
+        self.assertEqual(stats.order(URL, ["http_regex_search"]), ["http_regex_search"])
+        # Without skip_failing, the failing strategy is only tried last among the sampled ones
+        self.assertEqual(self.open_stats().order(URL, STRATEGIES),
+                         ["bibitnow", "regex_search", "http_regex_search", "google_scholar"])
+
+
+if __name__ == "__main__":
+    unittest.main()